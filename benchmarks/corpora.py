@@ -0,0 +1,117 @@
+# Copyright (C) 2016-2017 Perceval Wajsburt <perceval.wajsburt@gmail.com>
+#
+# This module is part of SublimeTerm and is released under
+# the MIT License: http://www.opensource.org/licenses/mit-license.php
+
+"""
+Canned terminal output corpora
+
+Each corpus mimics the output of a common program and is built from a
+fixed seed, so that two runs of the benchmarks parse the same bytes.
+"""
+
+import random
+
+from .workload import generate
+
+__all__ = ['CORPORA', 'build_corpus']
+
+WORDS = ("the quick brown fox jumps over lazy dog lorem ipsum dolor sit amet "
+         "consectetur adipiscing elit sed do eiusmod tempor incididunt").split()
+
+ESC = '\x1b'
+
+
+def plain_text(rng, size):
+    """Prose with line feeds, like `cat README`"""
+    lines = []
+    while sum(map(len, lines)) < size:
+        lines.append(' '.join(rng.choice(WORDS) for i in range(rng.randint(3, 14))) + '\r\n')
+    return ''.join(lines)
+
+
+def ls_color(rng, size):
+    """`ls -l --color` listing: one colored name per line"""
+    colors = ['01;34', '01;32', '01;36', '00', '01;31']
+    lines = []
+    while sum(map(len, lines)) < size:
+        name = rng.choice(WORDS) + rng.choice(['', '.py', '.txt', '.tar.gz', '/'])
+        lines.append('-rw-r--r-- 1 user staff {:>8} Jan {:>2} 12:{:02d} {}[{}m{}{}[0m\r\n'.format(
+            rng.randint(0, 10 ** 7), rng.randint(1, 31), rng.randint(0, 59),
+            ESC, rng.choice(colors), name, ESC))
+    return ''.join(lines)
+
+
+def compiler_errors(rng, size):
+    """gcc diagnostics with bold file names, colored severities and carets"""
+    lines = []
+    while sum(map(len, lines)) < size:
+        line = rng.randint(1, 999)
+        column = rng.randint(1, 40)
+        code = ' '.join(rng.choice(WORDS) for i in range(rng.randint(2, 8)))
+        lines.append('{0}[01m{0}[Ksrc/{1}.c:{2}:{3}:{0}[m{0}[K {0}[01;31m{0}[Kerror: {0}[m{0}[K'
+                     '\'{4}\' undeclared here\r\n'.format(ESC, rng.choice(WORDS), line, column, rng.choice(WORDS)))
+        lines.append('  {} | {}\r\n'.format(line, code))
+        lines.append('      | {}{}[01;32m{}[K^~~~{}[m{}[K\r\n'.format(' ' * column, ESC, ESC, ESC, ESC))
+    return ''.join(lines)
+
+
+def vim_redraws(rng, size, width=80, height=24):
+    """Full screen editor: alternate screen, absolute moves and line erasals"""
+    chunks = [ESC + '[?1049h', ESC + '[H', ESC + '[2J']
+    total = 0
+    while total < size:
+        row = rng.randint(1, height)
+        text = ' '.join(rng.choice(WORDS) for i in range(rng.randint(1, 10)))[:width - 8]
+        chunk = '{0}[{1};1H{0}[K{0}[33m{1:>4} {0}[m{2}'.format(ESC, row, text)
+        if rng.random() < 0.1:
+            chunk += '{0}[{1};1H{0}[7m-- INSERT --{0}[m{0}[K'.format(ESC, height)
+        chunks.append(chunk)
+        total += len(chunk)
+    chunks.append(ESC + '[?1049l')
+    return ''.join(chunks)
+
+
+def progress_bars(rng, size, width=50):
+    """Download progress bars redrawn in place with carriage returns"""
+    chunks = []
+    total = 0
+    while total < size:
+        for percent in range(0, 101, rng.randint(1, 5)):
+            done = percent * width // 100
+            chunk = '\r{:>3}% [{}{}] {:.1f} MB/s'.format(percent, '=' * done, ' ' * (width - done),
+                                                        rng.random() * 10)
+            chunks.append(chunk)
+            total += len(chunk)
+        chunks.append('\r\n')
+    return ''.join(chunks)
+
+
+def long_lines(rng, size):
+    """Minified files and JSON dumps: very few line feeds"""
+    lines = []
+    while sum(map(len, lines)) < size:
+        lines.append(','.join('"{}":{}'.format(rng.choice(WORDS), rng.randint(0, 999))
+                              for i in range(rng.randint(200, 600))) + '\r\n')
+    return ''.join(lines)
+
+
+def synthetic(rng, size):
+    """Default mix of the workload generator"""
+    return generate(size, seed=rng.randint(0, 2 ** 32))
+
+
+CORPORA = {
+    "plain_text": plain_text,
+    "ls_color": ls_color,
+    "compiler_errors": compiler_errors,
+    "vim_redraws": vim_redraws,
+    "progress_bars": progress_bars,
+    "long_lines": long_lines,
+    "synthetic": synthetic,
+}
+
+
+def build_corpus(name, size, seed=0):
+    """Returns about `size` characters of the corpus `name`"""
+    return CORPORA[name](random.Random(seed), size)
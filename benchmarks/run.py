@@ -0,0 +1,237 @@
+# Copyright (C) 2016-2017 Perceval Wajsburt <perceval.wajsburt@gmail.com>
+#
+# This module is part of SublimeTerm and is released under
+# the MIT License: http://www.opensource.org/licenses/mit-license.php
+
+"""
+Terminal pipeline benchmarks
+
+Measures the throughput of the output pipeline over the canned corpora:
+
+    fsm/<corpus>        FSM.process_list alone, the screen actions do nothing
+    decode/<corpus>     ANSIOutputTranscoder.decode by 4 kB reads, with a
+                        pop_output after each read like the view does
+    primitives/<name>   OutputTranscoder primitives, cost by call
+
+Usage:
+
+    python -m benchmarks.run [--size 8192] [--repeat 3] [--only decode]
+                             [--output results.json]
+                             [--baseline baseline.json] [--tolerance 10]
+
+With --baseline, the results are compared to a previous --output file
+and the exit status is 1 if a benchmark got slower than the tolerance.
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+
+from sublimeterm.ansi_output_transcoder import ANSIOutputTranscoder
+from sublimeterm.output_transcoder import OutputTranscoder
+
+from .corpora import CORPORA, build_corpus
+
+__all__ = ['run_benchmarks', 'compare']
+
+READ_SIZE = 4096
+
+
+class NullScreen:
+    """Screen whose every method does nothing, to time the FSM alone"""
+
+    def __getattr__(self, name):
+        return self.ignore
+
+    def ignore(self, *args, **kwargs):
+        pass
+
+
+def best_time(function, repeat):
+    """Returns the best duration of `repeat` calls of `function`
+
+    `function` is called with no argument and returns the
+    callable to time, so that the setup is not timed
+    """
+    best = None
+    for i in range(repeat):
+        timed = function()
+        start = time.perf_counter()
+        timed()
+        duration = time.perf_counter() - start
+        best = duration if best is None else min(best, duration)
+    return best
+
+
+def bench_fsm(corpus):
+    def setup():
+        state = ANSIOutputTranscoder().state
+        state.memory = [NullScreen()]
+        return lambda: state.process_list(corpus)
+    return setup
+
+
+def bench_decode(corpus):
+    def setup():
+        output_transcoder = ANSIOutputTranscoder()
+
+        def run():
+            for i in range(0, len(corpus), READ_SIZE):
+                output_transcoder.decode(corpus[i:i + READ_SIZE])
+                output_transcoder.pop_output()
+        return run
+    return setup
+
+
+def bench_primitive(name, count):
+    rng = random.Random(0)
+    positions = [(rng.randint(1, 80), rng.randint(1, 24)) for i in range(count)]
+
+    def setup():
+        output_transcoder = OutputTranscoder()
+        # Start from a filled screen
+        for y in range(24):
+            output_transcoder.write('x' * 80)
+            output_transcoder.crlf()
+        output_transcoder.move_to(1, 1)
+
+        def write():
+            for i in range(count):
+                output_transcoder.write_char('a')
+
+        def crlf():
+            for i in range(count):
+                output_transcoder.crlf()
+
+        def move_to():
+            for (x, y) in positions:
+                output_transcoder.move_to(x, y)
+                output_transcoder.clean_cursor()
+
+        def erase_end_of_line():
+            for (x, y) in positions:
+                output_transcoder.move_to(x, y)
+                output_transcoder.erase_end_of_line()
+
+        return locals()[name]
+    return setup
+
+
+PRIMITIVES = ["write", "crlf", "move_to", "erase_end_of_line"]
+
+
+def result(count, seconds, unit):
+    r = {
+        "unit": unit,
+        "count": count,
+        "seconds": round(seconds, 6),
+        "ns_per_unit": round(seconds / count * 1e9, 1),
+    }
+    if unit == "byte":
+        r["mb_per_s"] = round(count / seconds / 1e6, 4)
+    return r
+
+
+def run_benchmarks(size=8192, repeat=3, only=None, log=None):
+    """Runs the benchmarks
+
+    Keyword Arguments:
+        size {int} -- Size in characters of each corpus (default: {8192})
+        repeat {int} -- Runs of each benchmark, the best one is kept (default: {3})
+        only {str} -- Only run the benchmarks whose name contains this (default: {None})
+        log {callable} -- Called with each benchmark name and result (default: {None})
+
+    Returns:
+        dict -- results by benchmark name
+    """
+    benchmarks = []
+    for corpus_name in sorted(CORPORA):
+        corpus = build_corpus(corpus_name, size)
+        benchmarks.append(("fsm/" + corpus_name, len(corpus.encode('UTF-8')), "byte", bench_fsm(corpus)))
+        benchmarks.append(("decode/" + corpus_name, len(corpus.encode('UTF-8')), "byte", bench_decode(corpus)))
+    count = max(1, size // 8)
+    for name in PRIMITIVES:
+        benchmarks.append(("primitives/" + name, count, "op", bench_primitive(name, count)))
+
+    results = {}
+    for (name, count, unit, setup) in benchmarks:
+        if only and only not in name:
+            continue
+        results[name] = result(count, best_time(setup, repeat), unit)
+        if log is not None:
+            log(name, results[name])
+    return results
+
+
+def compare(results, baseline, tolerance=10.):
+    """Compares results to a baseline
+
+    Arguments:
+        results {dict} -- results by benchmark name
+        baseline {dict} -- baseline results by benchmark name
+
+    Keyword Arguments:
+        tolerance {number} -- Slowdown in percents above which a benchmark
+                              is a regression (default: {10.})
+
+    Returns:
+        list -- (name, baseline cost, cost, change in percents, regression) by benchmark
+    """
+    rows = []
+    for name in sorted(set(results) & set(baseline)):
+        before = baseline[name]["ns_per_unit"]
+        after = results[name]["ns_per_unit"]
+        change = (after - before) / before * 100 if before else 0.
+        rows.append((name, before, after, change, change > tolerance))
+    return rows
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="SublimeTerm pipeline benchmarks")
+    parser.add_argument("--size", type=int, default=8192, help="size of each corpus, in characters")
+    parser.add_argument("--repeat", type=int, default=3, help="runs of each benchmark, the best is kept")
+    parser.add_argument("--only", help="only run the benchmarks whose name contains this")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare the results to this JSON file")
+    parser.add_argument("--tolerance", type=float, default=10., help="allowed slowdown, in percents")
+    options = parser.parse_args(args)
+
+    def log(name, r):
+        throughput = "{:>10.4f} MB/s".format(r["mb_per_s"]) if "mb_per_s" in r else " " * 15
+        print("{:<30}{}{:>14.1f} ns/{}".format(name, throughput, r["ns_per_unit"], r["unit"]))
+
+    results = run_benchmarks(size=options.size, repeat=options.repeat, only=options.only, log=log)
+
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump({
+                "meta": {
+                    "time": time.time(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "size": options.size,
+                    "repeat": options.repeat,
+                },
+                "results": results,
+            }, f, indent=2, sort_keys=True)
+
+    if options.baseline:
+        with open(options.baseline) as f:
+            baseline = json.load(f)["results"]
+        print()
+        regressions = 0
+        for (name, before, after, change, regression) in compare(results, baseline, options.tolerance):
+            regressions += regression
+            print("{:<30}{:>14.1f}{:>14.1f}{:>+9.1f}%{}".format(name, before, after, change,
+                                                               "  REGRESSION" if regression else ""))
+        if regressions:
+            print("{} regression(s) above {}%".format(regressions, options.tolerance))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
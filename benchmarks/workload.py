@@ -0,0 +1,231 @@
+# Copyright (C) 2016-2017 Perceval Wajsburt <perceval.wajsburt@gmail.com>
+#
+# This module is part of SublimeTerm and is released under
+# the MIT License: http://www.opensource.org/licenses/mit-license.php
+
+"""
+Synthetic terminal workload
+
+Generates a seeded, parameterised terminal stream made of text and of
+the escape sequences ANSIOutputTranscoder registers, and only those,
+so that a change of the parser or of the buffer can be measured on a
+known mix of work.
+
+It can be used as a library (`generate`) or as the child command of a
+ProcessController (`command`), in which case it writes the stream to
+its stdout:
+
+    python benchmarks/workload.py --seed 1 --size 100000 --sgr 0.5 --cursor absolute
+
+This file must not import the rest of the package, to run as a script.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+__all__ = ['Workload', 'generate', 'command']
+
+ESC = '\x1b'
+CSI = ESC + '['
+
+WORDS = ("the quick brown fox jumps over lazy dog lorem ipsum dolor sit amet "
+         "consectetur adipiscing elit sed do eiusmod tempor incididunt").split()
+
+UNICODE = "éèàçùœæßøåñüöäÉÀΩπλμ€£→←↑↓✓✗日本語中文한국어"
+
+# Sequences registered by ANSIOutputTranscoder, by kind. {} are numbers.
+SEQUENCES = {
+    "sgr": [CSI + 'm', CSI + '{}m', CSI + '{};{}m', CSI + '{};{};{}m'],
+    "relative": [CSI + 'A', CSI + 'B', CSI + 'C', CSI + 'D',
+                 CSI + '{}A', CSI + '{}B', CSI + '{}C', CSI + '{}D', CSI + '{}G', '\x08'],
+    "absolute": [CSI + 'H', CSI + '{};{}H', CSI + '{};{}f'],
+    "erase": [CSI + 'K', CSI + '0K', CSI + '1K', CSI + '2K', CSI + 'J', CSI + '0J', CSI + '2J',
+              CSI + 'P', CSI + '{}P', CSI + '{}@'],
+    "other": [ESC + '(B', ESC + ')0', ESC + '7', ESC + '8', ESC + 'M', ESC + '=', ESC + '#8', '\x07',
+              CSI + 'r', CSI + '{};{}r', CSI + '{}q', CSI + '{}l', CSI + '?25l', CSI + '?25h',
+              CSI + '?1h', CSI + '?1l', CSI + '?2004h', CSI + '?2004l', CSI + '>c', CSI + '0c'],
+}
+
+# Numbers that make sense for each sequence kind
+SGR_CODES = [0, 1, 4, 7, 22, 24, 27, 30, 31, 32, 33, 34, 35, 36, 37, 39, 40, 41, 42, 44, 49, 90, 97]
+
+CURSOR_PATTERNS = ("none", "relative", "absolute", "mixed")
+
+
+class Workload:
+    """Parameters of a synthetic stream
+
+    Keyword Arguments:
+        seed {int} -- Seed of the random generator (default: {0})
+        text_ratio {number} -- Share of the stream made of text rather than
+                               escape sequences, between 0 and 1 (default: {0.8})
+        sgr {number} -- Probability that a text run starts with a SGR (default: {0.3})
+        cursor {str} -- Cursor addressing pattern: "none", "relative",
+                        "absolute" or "mixed" (default: {"mixed"})
+        line_length {int} -- Mean line length (default: {60})
+        unicode {number} -- Share of non-ASCII characters in the text (default: {0.05})
+        progress {number} -- Probability that a line is a \\r progress
+                             bar burst (default: {0.05})
+        width {int} -- Screen width for the cursor addressing (default: {80})
+        height {int} -- Screen height for the cursor addressing (default: {24})
+    """
+
+    def __init__(self, seed=0, text_ratio=0.8, sgr=0.3, cursor="mixed", line_length=60, unicode=0.05,
+                 progress=0.05, width=80, height=24):
+        if cursor not in CURSOR_PATTERNS:
+            raise ValueError("Unknown cursor pattern {}".format(cursor))
+        self.rng = random.Random(seed)
+        self.text_ratio = text_ratio
+        self.sgr = sgr
+        self.cursor = cursor
+        self.line_length = line_length
+        self.unicode = unicode
+        self.progress = progress
+        self.width = width
+        self.height = height
+
+        self.text_size = 0
+        self.escape_size = 0
+        # The stream is on the alternate screen, and must leave it at the end
+        self.asb = False
+
+    def text(self, length):
+        rng = self.rng
+        chars = []
+        while len(chars) < length:
+            if self.unicode and rng.random() < self.unicode:
+                chars.append(rng.choice(UNICODE))
+            else:
+                chars.extend(rng.choice(WORDS))
+                chars.append(' ')
+        return ''.join(chars[:length])
+
+    def number(self, template):
+        rng = self.rng
+        if template.endswith('m'):
+            return [rng.choice(SGR_CODES) for i in range(template.count('{}'))]
+        if template.endswith(('H', 'f', 'r')):
+            return [rng.randint(1, self.height), rng.randint(1, self.width)][:template.count('{}')]
+        return [rng.randint(1, 8) for i in range(template.count('{}'))]
+
+    def sequence(self, kind):
+        template = self.rng.choice(SEQUENCES[kind])
+        return template.format(*self.number(template))
+
+    def escape(self):
+        """Returns a random escape sequence allowed by the parameters"""
+        kinds = ["sgr", "erase", "other"]
+        if self.cursor in ("relative", "mixed"):
+            kinds.append("relative")
+        if self.cursor in ("absolute", "mixed"):
+            kinds.append("absolute")
+        kind = self.rng.choice(kinds)
+        if kind == "other" and self.rng.random() < 0.02:
+            # Switch between the main and the alternate screen once in a while
+            self.asb = not self.asb
+            return CSI + ('?1049h' if self.asb else '?1049l')
+        return self.sequence(kind)
+
+    def line(self):
+        """Returns a line of the stream"""
+        rng = self.rng
+        if self.progress and rng.random() < self.progress:
+            parts = [self.progress_bar()]
+            self.balance(parts)
+            return ''.join(parts) + '\r\n'
+
+        length = max(1, int(rng.expovariate(1. / self.line_length)))
+        parts = []
+        while length > 0:
+            if rng.random() < self.sgr:
+                parts.append(self.sequence("sgr"))
+                self.escape_size += len(parts[-1])
+            run = min(length, rng.randint(1, 20))
+            parts.append(self.text(run))
+            self.text_size += run
+            length -= run
+            self.balance(parts)
+        parts.append('\r\n')
+        return ''.join(parts)
+
+    def balance(self, parts):
+        """Appends escape sequences until the text / escape ratio is back to the target"""
+        while self.text_size and self.text_ratio < 1 and \
+                self.text_size / float(self.text_size + self.escape_size) > self.text_ratio:
+            parts.append(self.escape())
+            self.escape_size += len(parts[-1])
+
+    def progress_bar(self, width=40):
+        steps = []
+        for percent in range(0, 101, self.rng.randint(5, 25)):
+            done = percent * width // 100
+            steps.append('\r{:>3}% [{}{}]'.format(percent, '#' * done, '.' * (width - done)))
+            self.text_size += len(steps[-1])
+        return ''.join(steps)
+
+    def chunks(self, size):
+        """Yields lines until about `size` characters have been generated"""
+        total = 0
+        while total < size:
+            line = self.line()
+            total += len(line)
+            yield line
+        if self.asb:
+            self.asb = False
+            yield CSI + '?1049l'
+
+
+def generate(size, **kwargs):
+    """Returns about `size` characters of a stream with the Workload parameters `kwargs`"""
+    return ''.join(Workload(**kwargs).chunks(size))
+
+
+def command(python=None, **kwargs):
+    """Returns the command line that writes a stream to stdout, for a ProcessController
+
+    Keyword Arguments:
+        python {str} -- Python interpreter (default: {None}, the current one)
+        kwargs -- Workload parameters, and `size`, `rate` (see the command line options)
+    """
+    args = [python or sys.executable, os.path.realpath(__file__)]
+    for (name, value) in sorted(kwargs.items()):
+        args.extend(["--" + name.replace('_', '-'), str(value)])
+    return args
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Synthetic terminal workload")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--size", type=int, default=100000, help="characters to write")
+    parser.add_argument("--text-ratio", type=float, default=0.8)
+    parser.add_argument("--sgr", type=float, default=0.3)
+    parser.add_argument("--cursor", choices=CURSOR_PATTERNS, default="mixed")
+    parser.add_argument("--line-length", type=int, default=60)
+    parser.add_argument("--unicode", type=float, default=0.05)
+    parser.add_argument("--progress", type=float, default=0.05)
+    parser.add_argument("--width", type=int, default=80)
+    parser.add_argument("--height", type=int, default=24)
+    parser.add_argument("--rate", type=float, default=0, help="characters per second, 0 for full speed")
+    options = vars(parser.parse_args(args))
+    size = options.pop("size")
+    rate = options.pop("rate")
+
+    out = sys.stdout.buffer
+    start = time.time()
+    written = 0
+    for chunk in Workload(**options).chunks(size):
+        out.write(chunk.encode('UTF-8'))
+        written += len(chunk)
+        if rate:
+            out.flush()
+            delay = written / rate - (time.time() - start)
+            if delay > 0:
+                time.sleep(delay)
+    out.flush()
+
+
+if __name__ == '__main__':
+    main()
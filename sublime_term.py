@@ -5,7 +5,7 @@
 
 import sublime, sublime_plugin, sublime_api
 import subprocess
-import sys, imp, os
+import sys, imp, os, time
 
 from . import sublimeterm
 
@@ -41,6 +41,10 @@ class TermCommand(sublime_plugin.WindowCommand):
                 c.write_special_character(sublimeterm.SpecialChar.TAB)
             if key == "escape":
                 c.write_special_character(sublimeterm.SpecialChar.ESCAPE)
+            if key == "interrupt":
+                c.write_control_character(sublimeterm.SpecialChar.INTERRUPT)
+            if key == "suspend":
+                c.write_control_character(sublimeterm.SpecialChar.SUSPEND)
             return
 
         imp.reload(sublimeterm)
@@ -67,8 +71,23 @@ class TermCommand(sublime_plugin.WindowCommand):
 
         output_panel = self.settings.get("output_panel", False) if output_panel is None else output_panel
 
-        it = sublimeterm.InputTranscoder()
-        ot = sublimeterm.ANSIOutputTranscoder()
+        parsing_process = self.settings.get("parsing_process", False)
+
+        record_path = self.settings.get("recording_path", None)
+        if record_path:
+            record_path = time.strftime(os.path.expanduser(record_path))
+
+        if self.settings.get("latency_tracing", False):
+            sublimeterm.LatencyTracer.enable()
+        if self.settings.get("profiling", False):
+            sublimeterm.Profiler.start()
+
+        it = sublimeterm.InputTranscoder(numeric_argument=self.settings.get("readline_numeric_argument", False))
+        if parsing_process:
+            from .sublimeterm import remote
+            ot = remote.RemoteOutputTranscoder()
+        else:
+            ot = sublimeterm.ANSIOutputTranscoder()
 
         view_controller = sublimeterm.SublimetermViewController(
             it,
@@ -76,18 +95,98 @@ class TermCommand(sublime_plugin.WindowCommand):
             settings=self.settings,
             output_panel=output_panel
         )
-        process_controller = sublimeterm.ProcessController(
-            it,
-            ot,
-            command=command,
-            cwd=cwd,
-            env=child_env
-        )
+        if parsing_process:
+            process_controller = remote.RemoteProcessController(
+                it,
+                ot,
+                command=command,
+                cwd=cwd,
+                env=child_env,
+                python=self.settings.get("python_executable", "python3"),
+                record_path=record_path
+            )
+        else:
+            reactor = None
+            if self.settings.get("shared_reactor", False):
+                reactor = sublimeterm.Reactor.shared(workers=self.settings.get("reactor_workers", 2))
+
+            process_controller = sublimeterm.ProcessController(
+                it,
+                ot,
+                command=command,
+                cwd=cwd,
+                env=child_env,
+                reactor=reactor,
+                paste_chunk_size=self.settings.get("paste_chunk_size", 1024),
+                record_path=record_path
+            )
 
         view_controller.start()
         process_controller.start()
 
 
+class TermLatencyCommand(sublime_plugin.WindowCommand):
+    """
+    ##########################
+    TermLatencyCommand Class
+    Shows, dumps or resets the
+    keystroke-to-echo latencies
+    ##########################
+    """
+
+    def run(self, action="show", path=None):
+        if action == "enable":
+            sublimeterm.LatencyTracer.enable()
+            return
+        if action == "disable":
+            sublimeterm.LatencyTracer.disable()
+            return
+
+        tracer = sublimeterm.LatencyTracer.instance
+        if tracer is None:
+            sublime.status_message("Term: latency tracing is disabled")
+            return
+        if action == "show":
+            panel = self.window.create_output_panel("term_latency")
+            panel.run_command("append", {"characters": tracer.report() + "\n"})
+            self.window.run_command("show_panel", {"panel": "output.term_latency"})
+        elif action == "dump":
+            settings = sublime.load_settings("Term.sublime-settings")
+            path = path or settings.get("latency_dump_path") or \
+                os.path.join(sublime.packages_path(), "User", "Term.latency.json")
+            tracer.dump(path)
+            sublime.status_message("Term: latencies written to " + path)
+        elif action == "reset":
+            tracer.reset()
+
+
+class TermProfileCommand(sublime_plugin.WindowCommand):
+    """
+    ##########################
+    TermProfileCommand Class
+    Starts the pipeline profiler,
+    or stops it and writes the
+    Chrome trace
+    ##########################
+    """
+
+    def run(self, action="start", path=None):
+        if action == "start":
+            sublimeterm.Profiler.start()
+            sublime.status_message("Term: profiling")
+            return
+
+        profiler = sublimeterm.Profiler.stop()
+        if profiler is None:
+            sublime.status_message("Term: the profiler is not running")
+            return
+        settings = sublime.load_settings("Term.sublime-settings")
+        path = path or settings.get("profiling_trace_path") or \
+            os.path.join(sublime.packages_path(), "User", "Term.trace.json")
+        profiler.dump(path)
+        sublime.status_message("Term: trace written to " + path)
+
+
 class TermEditorCommand(sublime_plugin.TextCommand):
     """
     ##########################
@@ -7,21 +7,45 @@
 import imp
 import logging
 
+from . import activity
 from . import ansi_output_transcoder
 from . import input_transcoder
+from . import latency
 from . import output_transcoder
 from . import process_controller
-from . import sublimeterm_view_controller
+from . import profiler
+from . import reactor
+from . import recording
+from . import ring_buffer
 from . import utils
+try:
+    from . import sublimeterm_view_controller
+except ImportError:
+    # Outside of Sublime Text, for example in the parsing helper process
+    sublimeterm_view_controller = None
 imp.reload(utils)
-imp.reload(sublimeterm_view_controller)
+imp.reload(activity)
+imp.reload(latency)
+imp.reload(profiler)
+if sublimeterm_view_controller is not None:
+    imp.reload(sublimeterm_view_controller)
 imp.reload(input_transcoder)
 imp.reload(output_transcoder)
 imp.reload(ansi_output_transcoder)
+imp.reload(ring_buffer)
+imp.reload(recording)
+imp.reload(reactor)
 imp.reload(process_controller)
 from .utils import *
+from .activity import *
 from .ansi_output_transcoder import *
 from .input_transcoder import *
+from .latency import *
 from .output_transcoder import *
 from .process_controller import *
-from .sublimeterm_view_controller import *
\ No newline at end of file
+from .profiler import *
+from .reactor import *
+from .recording import *
+from .ring_buffer import *
+if sublimeterm_view_controller is not None:
+    from .sublimeterm_view_controller import *
\ No newline at end of file
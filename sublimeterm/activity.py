@@ -0,0 +1,118 @@
+# Copyright (C) 2016-2017 Perceval Wajsburt <perceval.wajsburt@gmail.com>
+#
+# This module is part of SublimeTerm and is released under
+# the MIT License: http://www.opensource.org/licenses/mit-license.php
+
+"""
+Output quiescence detection
+
+Tells when the output of a process has settled, or when it shows
+something, without polling: the waiting threads sleep on a condition
+that is notified by every read and every decoded sequence.
+
+    controller.wait_for(r"\\$ $", timeout=5)
+    input_transcoder.write("make\\n")
+    controller.wait_idle(quiet_ms=200, timeout=60)
+"""
+
+import re
+import time
+from threading import Condition
+
+__all__ = ['Activity']
+
+
+class Activity:
+    """Events of an output stream
+
+    Notified by the producers (the PTY reads, the end of the decoded
+    sequences) and closed once the stream has ended, so that the
+    waiters do not wait for output that will never come.
+    """
+
+    def __init__(self):
+        self.condition = Condition()
+        # Count of events, to know if something happened during a check
+        self.count = 0
+        self.last_event = time.monotonic()
+        self.closed = False
+
+    def notify(self):
+        with self.condition:
+            self.count += 1
+            self.last_event = time.monotonic()
+            self.condition.notify_all()
+
+    def close(self):
+        """The stream has ended: wakes up the waiters for good"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def wait_idle(self, quiet_ms=100, timeout=None):
+        """Waits until no event happened for `quiet_ms` milliseconds
+
+        Keyword Arguments:
+            quiet_ms {number} -- Required duration without any event (default: {100})
+            timeout {number} -- Maximum duration of the wait in seconds (default: {None}, no limit)
+
+        Returns:
+            bool -- True if the stream is idle, False if it was still active after `timeout`
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while not self.closed:
+                now = time.monotonic()
+                idle_at = self.last_event + quiet_ms / 1000.
+                if now >= idle_at:
+                    break
+                if deadline is not None and now >= deadline:
+                    return False
+                # Any event pushes `idle_at` back, the next loop will see it
+                self.condition.wait(idle_at - now if deadline is None else min(idle_at, deadline) - now)
+        return True
+
+    def wait_for(self, read, pattern, timeout=None):
+        """Waits until the text returned by `read` matches `pattern`
+
+        The text is checked at once, then after each event.
+
+        Arguments:
+            read {callable} -- returns the current text
+            pattern {str|regex|callable} -- regular expression searched in the text,
+                                            or predicate called with the text
+
+        Keyword Arguments:
+            timeout {number} -- Maximum duration of the wait in seconds (default: {None}, no limit)
+
+        Returns:
+            object -- the match object, or the result of the predicate,
+                      None if it did not match before `timeout` or the end of the stream
+        """
+        if callable(pattern):
+            match = pattern
+        else:
+            if not hasattr(pattern, "search"):
+                pattern = re.compile(pattern)
+            match = pattern.search
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self.condition:
+                count = self.count
+                closed = self.closed
+            # The text is read without holding the condition: the producers
+            # notify it while holding their own locks
+            result = match(read())
+            if result:
+                return result
+            if closed:
+                return None
+            with self.condition:
+                while self.count == count and not self.closed:
+                    if deadline is None:
+                        self.condition.wait()
+                        continue
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return None
+                    self.condition.wait(remaining)
@@ -28,6 +28,7 @@ import string
 
 from .fsm import *
 from .output_transcoder import *
+from .profiler import *
 
 
 logger = logging.getLogger()
@@ -231,6 +232,8 @@ def DoModecrapL(fsm):
     screen = fsm.memory[0]
     if arg == 1049:
         screen.switchASBOff()
+    elif arg == 2004:
+        screen.bracketed_paste = False
     fsm.memory = [screen]
 
 
@@ -240,6 +243,8 @@ def DoModecrapH(fsm):
     screen = fsm.memory[0]
     if arg == 1049:
         screen.switchASBOn()
+    elif arg == 2004:
+        screen.bracketed_paste = True
     fsm.memory = [screen]
 
 
@@ -352,11 +357,12 @@ class ANSIOutputTranscoder(OutputTranscoder):
         """Process text, writing it to the virtual screen while handling
         ANSI escape codes.
         """
-        if isinstance(s, bytes):
-            s = s.decode('UTF-8')
-        self.begin_sequence()
-        self.state.process_list(s)
-        self.end_sequence()
+        with profile("decode"):
+            if isinstance(s, bytes):
+                s = s.decode('UTF-8')
+            self.begin_sequence()
+            self.state.process_list(s)
+            self.end_sequence()
 
     @staticmethod
     def do_sgr(fsm):
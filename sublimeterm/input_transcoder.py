@@ -6,7 +6,9 @@
 import logging
 import struct
 import termios
+from collections import deque
 
+from .latency import *
 from .utils import *
 
 try:
@@ -25,46 +27,173 @@ __all__ = ['InputTranscoder']
 
 
 class InputTranscoder():
-    def __init__(self):
+    """Queues the user inputs for the ProcessController
+
+    Inputs are (input_type, content) tuples:
+        0 -- text to write to the process
+        1 -- (request, argument) ioctl on the PTY
+        2 -- signal to send to the process group
+        5 -- (text, bracketed) paste, streamed by chunks
+
+    Cursor moves and erasals are queued as (3, rel) and (4, n) and only
+    encoded to text when they are popped, after the consecutive ones
+    have been folded into their net effect (see `optimize`)
+
+    Signals, resizes and the interrupting control characters go through
+    a priority lane and are popped before any other queued input
+    """
+
+    def __init__(self, numeric_argument=False):
         self.input_queue = Queue()
+        self.priority_inputs = deque()
+
+        # Inputs already taken from the queue and optimized,
+        # but not popped yet
+        self.optimized_inputs = deque()
+
+        # Use readline numeric arguments (ESC n) to repeat the
+        # moves and erasals instead of repeating the key
+        self.numeric_argument = numeric_argument
+
+        # Called after each queued input, to wake up a reactor
+        self.on_input = None
 
     def pop_input(self, timeout):
-        try:
-            i = self.input_queue.get(timeout=timeout)
-        except:
+        if not self.optimized_inputs:
+            try:
+                i = self.input_queue.get(timeout=timeout)
+            except:
+                raise Empty
+            self.optimized_inputs.extend(self.optimize([i] + self.drain()))
+        priority_inputs = self.pop_priority_inputs()
+        if priority_inputs:
+            self.optimized_inputs.extendleft(reversed(priority_inputs[1:]))
+            return priority_inputs[0]
+        if not self.optimized_inputs:
             raise Empty
-        else:
-            return i
+        return self.optimized_inputs.popleft()
+
+    def pop_inputs(self):
+        """Returns every queued input without waiting, the priority ones first"""
+        inputs = self.optimize(list(self.optimized_inputs) + self.drain())
+        self.optimized_inputs.clear()
+        return self.pop_priority_inputs() + inputs
+
+    def pop_priority_inputs(self):
+        """Returns the inputs of the priority lane without waiting"""
+        inputs = []
+        while self.priority_inputs:
+            inputs.append(self.priority_inputs.popleft())
+        return inputs
+
+    def drain(self):
+        inputs = []
+        while True:
+            try:
+                i = self.input_queue.get(block=False)
+            except Empty:
+                return inputs
+            if i is not None:
+                inputs.append(i)
+
+    def optimize(self, inputs):
+        """Folds consecutive moves and erasals and encode them to text
+
+        Arguments:
+            inputs {list} -- queued inputs
+
+        Returns:
+            list -- inputs of type 0, 1 or 2 only
+        """
+        folded = []
+        for (input_type, content) in inputs:
+            if input_type in (3, 4) and folded and folded[-1][0] == input_type:
+                folded[-1] = (input_type, folded[-1][1] + content)
+            else:
+                folded.append((input_type, content))
+
+        optimized = []
+        for (input_type, content) in folded:
+            if input_type is None:
+                # Wake up token of the priority lane
+                continue
+            if input_type == 3:
+                if content > 0:
+                    optimized.append((0, self.repeat(SpecialChar.RIGHT, content)))
+                elif content < 0:
+                    optimized.append((0, self.repeat(SpecialChar.LEFT, -content)))
+            elif input_type == 4:
+                if content > 0:
+                    optimized.append((0, self.repeat(SpecialChar.DEL, content)))
+            else:
+                optimized.append((input_type, content))
+        return optimized
+
+    def repeat(self, key, n):
+        """Encodes `n` presses of `key`
+
+        With readline numeric arguments, ESC followed by the count
+        then the key, when it is shorter than repeating the key
+        """
+        if self.numeric_argument and n > 1:
+            prefixed = SpecialChar.ESCAPE + str(n) + key
+            if len(prefixed) < len(key) * n:
+                return prefixed
+        return key * n
+
+    def put(self, item):
+        self.input_queue.put(item)
+        trace(Stage.ENQUEUE)
+        if self.on_input is not None:
+            self.on_input()
+
+    def put_priority(self, item):
+        self.priority_inputs.append(item)
+        # Wake up a writer waiting on the queue
+        self.input_queue.put((None, None))
+        trace(Stage.ENQUEUE)
+        if self.on_input is not None:
+            self.on_input()
 
     def write(self, content):
-        self.input_queue.put((0, content))
+        if content in SpecialChar.INTERRUPTS:
+            self.put_priority((0, content))
+        else:
+            self.put((0, content))
+
+    def paste(self, content, bracketed=False):
+        """Queues a large text insertion
+
+        Arguments:
+            content {str} -- pasted text
+
+        Keyword Arguments:
+            bracketed {bool} -- Wrap the text in bracketed paste markers (default: {False})
+        """
+        self.put((5, (content, bracketed)))
+
+    def send_signal(self, signal_number):
+        self.put_priority((2, signal_number))
 
     def enter(self):
-        self.input_queue.put((0, "\n"))
+        self.put((0, "\n"))
 
     def set_size(self, w, h, pw, ph):
         s = struct.pack('HHHH', h, w, ph, pw)
         log_debug("SIZE TO BE SENT", struct.unpack('HHHH', s))
-        self.input_queue.put((1, (termios.TIOCSWINSZ, s)))
+        self.put_priority((1, (termios.TIOCSWINSZ, s)))
 
     #        self.input_queue.put((2, signal.SIGWINCH))
 
     def move(self, rel):
-
-        s = ""
-        if rel > 0:
-            s = ''.join([SpecialChar.RIGHT for s in range(rel)])
-        elif rel < 0:
-            s = ''.join([SpecialChar.LEFT for s in range(-rel)])
-        else:
+        if rel == 0:
             return
-        self.input_queue.put((0, s))
+        self.put((3, rel))
 
     def erase(self, n=1):
         if n <= 0:
             return
-        s = ''.join([SpecialChar.DEL for s in range(n)])
-        self.input_queue.put((0, s))
+        self.put((4, n))
 
 
 # [0, 1, 2, '\n'] -> 4 [a, b, c, d, '\n'] -> 5
@@ -0,0 +1,212 @@
+# Copyright (C) 2016-2017 Perceval Wajsburt <perceval.wajsburt@gmail.com>
+#
+# This module is part of SublimeTerm and is released under
+# the MIT License: http://www.opensource.org/licenses/mit-license.php
+
+"""
+Keystroke-to-echo latency tracing
+
+Each keystroke seen by the view opens a sample, which is then stamped
+the first time it goes through each stage of the pipeline:
+
+KEYSTROKE the view saw the modification (TermListener.on_modified)
+ENQUEUE   the input has been queued in the InputTranscoder
+WRITE     the input has been written to the PTY
+READ      the first output bytes have been read back from the PTY
+FLUSH     the OutputTranscoder published the parsed output
+EDIT      the output has been applied to the view (write_output)
+
+Nothing tells which output answers which input, so a stage is stamped
+on every sample that reached the previous stage, which is exact for the
+common case of one keystroke and its echo.
+"""
+
+import bisect
+import json
+import time
+from collections import deque
+from threading import Lock
+
+__all__ = ['LatencyTracer', 'Histogram', 'Stage', 'trace', 'trace_keystroke']
+
+
+class Stage:
+    KEYSTROKE = 0
+    ENQUEUE = 1
+    WRITE = 2
+    READ = 3
+    FLUSH = 4
+    EDIT = 5
+
+    NAMES = ['keystroke', 'enqueue', 'write', 'read', 'flush', 'edit']
+
+
+class Histogram:
+    """Latency histogram with logarithmic buckets
+
+    Bucket bounds grow by 2^(1/4) from 10us to about 10s, so that
+    the percentiles are known within 20% whatever the latency,
+    with a constant memory
+    """
+
+    bounds = [1e-5 * 2 ** (i / 4.) for i in range(81)]
+
+    def __init__(self):
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.
+        self.max = 0.
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, p):
+        """Returns the upper bound of the bucket holding the `p` percentile
+
+        Arguments:
+            p {number} -- percentile, between 0 and 100
+
+        Returns:
+            float -- latency in seconds, 0 if there is no sample
+        """
+        if not self.count:
+            return 0.
+        rank = max(1, p / 100. * self.count)
+        seen = 0
+        for (i, count) in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+        return self.max
+
+    def summary(self):
+        """Returns the count, the mean, p50, p95, p99 and max in milliseconds"""
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count * 1000, 3) if self.count else 0.,
+            "p50": round(self.percentile(50) * 1000, 3),
+            "p95": round(self.percentile(95) * 1000, 3),
+            "p99": round(self.percentile(99) * 1000, 3),
+            "max": round(self.max * 1000, 3),
+        }
+
+
+class LatencyTracer:
+    """Collects the keystroke-to-echo samples
+
+    There is at most one active tracer, `LatencyTracer.instance`, and
+    the stage hooks (`trace`) do nothing when tracing is disabled.
+
+    The histograms hold the delay between the keystroke and each stage,
+    the "edit" one being the full keystroke-to-echo latency
+    """
+
+    instance = None
+
+    def __init__(self, max_pending=256, expiry=5.):
+        # Samples not echoed yet, as lists of timestamps by stage
+        self.pending = deque()
+        self.max_pending = max_pending
+        # Keystrokes without echo (passwords, readline bindings...)
+        # are dropped after this delay
+        self.expiry = expiry
+        self.histograms = [Histogram() for stage in Stage.NAMES[1:]]
+        self.mutex = Lock()
+
+    @classmethod
+    def enable(cls, **kwargs):
+        """Starts tracing, if it is not already done
+
+        Returns:
+            LatencyTracer -- the active tracer
+        """
+        if cls.instance is None:
+            cls.instance = cls(**kwargs)
+        return cls.instance
+
+    @classmethod
+    def disable(cls):
+        cls.instance = None
+
+    def begin(self):
+        """Opens a sample for a new keystroke"""
+        now = time.time()
+        with self.mutex:
+            while self.pending and (len(self.pending) >= self.max_pending or
+                                    now - self.pending[0][Stage.KEYSTROKE] > self.expiry):
+                self.pending.popleft()
+            self.pending.append([now, None, None, None, None, None])
+
+    def mark(self, stage):
+        """Stamps the samples that just reached `stage`"""
+        if not self.pending:
+            return
+        now = time.time()
+        with self.mutex:
+            for sample in self.pending:
+                if sample[stage] is None and sample[stage - 1] is not None:
+                    sample[stage] = now
+            if stage == Stage.EDIT:
+                while self.pending and self.pending[0][Stage.EDIT] is not None:
+                    self.record(self.pending.popleft())
+                # Echoes can come back out of order, for example when
+                # an input is discarded by an interruption
+                if any(sample[Stage.EDIT] is not None for sample in self.pending):
+                    remaining = deque()
+                    for sample in self.pending:
+                        if sample[Stage.EDIT] is None:
+                            remaining.append(sample)
+                        else:
+                            self.record(sample)
+                    self.pending = remaining
+
+    def record(self, sample):
+        for stage in range(Stage.ENQUEUE, Stage.EDIT + 1):
+            if sample[stage] is not None:
+                self.histograms[stage - 1].add(sample[stage] - sample[Stage.KEYSTROKE])
+
+    def reset(self):
+        with self.mutex:
+            self.pending.clear()
+            self.histograms = [Histogram() for stage in Stage.NAMES[1:]]
+
+    def summary(self):
+        """Returns the summary of each stage histogram, by stage name"""
+        with self.mutex:
+            return {name: histogram.summary() for (name, histogram) in zip(Stage.NAMES[1:], self.histograms)}
+
+    def report(self):
+        """Formats the summary as a text table"""
+        summary = self.summary()
+        lines = ["{:<10}{:>8}{:>10}{:>10}{:>10}{:>10}{:>10}".format(
+            "stage (ms)", "count", "mean", "p50", "p95", "p99", "max")]
+        for name in Stage.NAMES[1:]:
+            s = summary[name]
+            lines.append("{:<10}{:>8}{:>10}{:>10}{:>10}{:>10}{:>10}".format(
+                name, s["count"], s["mean"], s["p50"], s["p95"], s["p99"], s["max"]))
+        return "\n".join(lines)
+
+    def dump(self, path):
+        """Writes the summary and the raw histograms to a JSON file"""
+        with self.mutex:
+            histograms = {name: {"bounds": Histogram.bounds, "counts": histogram.counts}
+                          for (name, histogram) in zip(Stage.NAMES[1:], self.histograms)}
+        with open(path, 'w') as f:
+            json.dump({"time": time.time(), "summary": self.summary(), "histograms": histograms}, f, indent=2)
+
+
+def trace_keystroke():
+    """Opens a latency sample if tracing is enabled"""
+    tracer = LatencyTracer.instance
+    if tracer is not None:
+        tracer.begin()
+
+
+def trace(stage):
+    """Stamps the pending latency samples if tracing is enabled"""
+    tracer = LatencyTracer.instance
+    if tracer is not None:
+        tracer.mark(stage)
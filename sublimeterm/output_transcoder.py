@@ -6,6 +6,10 @@
 import logging
 from threading import Event, Lock
 
+from .activity import *
+from .latency import *
+from .profiler import *
+
 try:
     from Queue import Queue, Empty
 except ImportError:
@@ -72,6 +76,12 @@ class OutputTranscoder:
         self.saved_lines = None
         self.saved_cursor = None
 
+        # The application asked the pastes to be bracketed (mode 2004)
+        self.bracketed_paste = False
+
+        # Notified at the end of every sequence, to wait for the output
+        self.activity = Activity()
+
     def set_size(self, w, h, pw, ph):
         self.max_lines = h
 
@@ -134,15 +144,18 @@ class OutputTranscoder:
         event.
         Frees the locked buffer.
         """
-        self.clean_cursor()
-        with self.io_mutex:
-            self.changed_content = ''.join(self.content[self.min_seq_cursor:self.max_seq_cursor])
-            debug("## {}".format(self.changed_content))
-            # debug("TOUT :{}\n------".format(self.content))
-            self.flushed = False
-            self.changed_event.set()
-            self.content_size = len(self.content)
-            self.is_processing.release()
+        with profile("end_sequence"):
+            self.clean_cursor()
+            with self.io_mutex:
+                self.changed_content = ''.join(self.content[self.min_seq_cursor:self.max_seq_cursor])
+                debug("## {}".format(self.changed_content))
+                # debug("TOUT :{}\n------".format(self.content))
+                self.flushed = False
+                self.changed_event.set()
+                self.content_size = len(self.content)
+                self.is_processing.release()
+        self.activity.notify()
+        trace(Stage.FLUSH)
 
     def pop_output(self, timeout=-1):
         """Waits and return changes in the buffer
@@ -163,12 +176,31 @@ class OutputTranscoder:
         if (timeout < 0 and not self.changed_event.is_set()) or not self.changed_event.wait(timeout=timeout):
             raise Empty
         else:
-            with self.io_mutex:
+            with profile("pop_output"), self.io_mutex:
                 self.changed_event.clear()
                 self.flushed = True
                 return (self.changed_content, self.min_seq_cursor, self.cursor, self.max_seq_cursor,
                         self.content_size - self.last_content_size, self.content_size)
 
+    def wait_idle(self, quiet_ms=100, timeout=None):
+        """Waits until no sequence has ended for `quiet_ms` milliseconds
+
+        See `Activity.wait_idle`
+        """
+        return self.activity.wait_idle(quiet_ms, timeout)
+
+    def wait_for(self, pattern, timeout=None):
+        """Waits until the content of the buffer matches `pattern`
+
+        See `Activity.wait_for`
+        """
+        return self.activity.wait_for(self.get_content, pattern, timeout)
+
+    def get_content(self):
+        """Returns the whole buffer, once the current sequence has ended"""
+        with self.is_processing:
+            return ''.join(self.content)
+
     def get_between(self, begin, end):
         """Returns a portion of the buffer
         
@@ -3,6 +3,7 @@
 # This module is part of SublimeTerm and is released under
 # the MIT License: http://www.opensource.org/licenses/mit-license.php
 
+import codecs
 import fcntl
 import logging
 import os
@@ -10,11 +11,18 @@ import select
 import signal
 import struct
 import subprocess
+import termios
 import time
+from collections import deque
 from threading import Lock, Thread
 
 from .ansi_output_transcoder import *
 from .input_transcoder import *
+from .latency import *
+from .profiler import *
+from .recording import *
+from .ring_buffer import *
+from .utils import *
 
 try:
     from Queue import Queue, Empty
@@ -44,13 +52,23 @@ else:
 class ProcessController:
     instance = None
 
-    def __new__(cls, input_transcoder, output_transcoder, command=None, cwd=None, env=None):
-        if isinstance(cls.instance, cls):
-            cls.instance.close()
-        cls.instance = object.__new__(cls)
-        return cls.instance
+    def __new__(cls, *args, **kwargs):
+        if isinstance(ProcessController.instance, ProcessController):
+            ProcessController.instance.close()
+        ProcessController.instance = object.__new__(cls)
+        return ProcessController.instance
 
-    def __init__(self, input_transcoder, output_transcoder, command=None, cwd=None, env=None):
+    interrupt_signals = {
+        SpecialChar.INTERRUPT: signal.SIGINT,
+        SpecialChar.QUIT: signal.SIGQUIT,
+        SpecialChar.SUSPEND: signal.SIGTSTP,
+    }
+
+    # Delay between two checks of the tty input queue while a paste is throttled
+    paste_poll_interval = 0.005
+
+    def __init__(self, input_transcoder, output_transcoder, command=None, cwd=None, env=None, reactor=None,
+                 buffer_size=65536, paste_chunk_size=1024, record_path=None):
         self.master = None
         self.slave = None
         self.process = None
@@ -65,7 +83,43 @@ class ProcessController:
         self.mutex = Lock()
         self.read_thread = None
         self.write_thread = None
+        self.parse_thread = None
+        self.wait_thread = None
         self.stop = False
+        self.wakeup_read = None
+        self.wakeup_write = None
+        # Closed when the process exits, to wake up the reading thread
+        self.exit_read = None
+        self.exit_write = None
+
+        # Raw output of the process, waiting to be parsed
+        self.output_buffer = RingBuffer(buffer_size)
+
+        # Inputs waiting for the PTY, text inputs are coalesced in
+        # the write buffer, the others wait in the backlog for the
+        # previous text to be written to keep their relative order
+        self.write_buffer = bytearray()
+        self.input_backlog = deque()
+
+        # Paste being streamed, a chunk is only written once the
+        # process has read the previous one
+        self.paste_chunk_size = paste_chunk_size
+        self.paste_chunks = deque()
+        self.paste_end = b''
+        self.paste_sent_at = None
+        self.paste_throttled = False
+
+        # Shared reactor, replacing the read, parse and write threads
+        self.reactor = reactor
+        self.paused = False
+        self.watching_writable = False
+
+        # Reads can split a multi-byte character
+        self.decoder = codecs.getincrementaldecoder('UTF-8')(errors='replace')
+
+        # Records the session to replay it later (see recording.py)
+        self.record_path = record_path
+        self.recorder = None
 
     def __enter__(self):
         """Enter the process controller running scope
@@ -94,15 +148,34 @@ class ProcessController:
         Arguments:
             command {list} -- command list for the process (ex: ['ls', '-la'])
         """
+        if self.record_path is not None:
+            self.recorder = SessionRecorder(self.record_path)
+
         # Create the PTY
         self.spawn(self.command, self.cwd, self.env)
 
+        if self.reactor is not None:
+            self.input_transcoder.on_input = lambda: self.reactor.schedule(self)
+            self.reactor.register(self)
+            return
+
         # Loops
+        # Wakes up the writing thread when an input is queued
+        self.wakeup_read, self.wakeup_write = os.pipe()
+        set_nonblocking(self.wakeup_read)
+        set_nonblocking(self.wakeup_write)
+        self.input_transcoder.on_input = self.wakeup
+        self.exit_read, self.exit_write = os.pipe()
+
         self.read_thread = Thread(target=self.keep_reading)
+        self.parse_thread = Thread(target=self.keep_parsing)
         self.write_thread = Thread(target=self.keep_writing)
+        self.wait_thread = Thread(target=self.keep_waiting)
 
         self.read_thread.start()
+        self.parse_thread.start()
         self.write_thread.start()
+        self.wait_thread.start()
 
     def close(self):
         """Stops the process controller
@@ -110,6 +183,11 @@ class ProcessController:
         Kill the process
         """
         self.stop = True
+        self.output_transcoder.activity.close()
+        if self.reactor is not None:
+            self.reactor.unregister(self)
+        if self.recorder is not None:
+            self.recorder.close()
         try:
             os.killpg(os.getpgid(self.process.pid), signal.SIGTERM)
         except ProcessLookupError:
@@ -118,6 +196,37 @@ class ProcessController:
             log_debug("Successfully killed")
         ProcessController.instance = None
 
+    def wait_idle(self, quiet_ms=100, timeout=None):
+        """Waits until the process has written nothing for `quiet_ms` milliseconds
+
+        Woken up by the PTY reads and the decoded sequences, returns
+        at once when the process has exited and its output is decoded
+
+        Keyword Arguments:
+            quiet_ms {number} -- Required duration without output (default: {100})
+            timeout {number} -- Maximum duration of the wait in seconds (default: {None}, no limit)
+
+        Returns:
+            bool -- True if the output is idle, False if it was still active after `timeout`
+        """
+        return self.output_transcoder.wait_idle(quiet_ms, timeout)
+
+    def wait_for(self, pattern, timeout=None):
+        """Waits until the decoded output matches `pattern`
+
+        Arguments:
+            pattern {str|regex|callable} -- regular expression searched in the output,
+                                            or predicate called with the output
+
+        Keyword Arguments:
+            timeout {number} -- Maximum duration of the wait in seconds (default: {None}, no limit)
+
+        Returns:
+            object -- the match object, or the result of the predicate,
+                      None on timeout or if the process exited without matching
+        """
+        return self.output_transcoder.wait_for(pattern, timeout)
+
     def spawn(self, command, cwd, env):
         """Starts the process
         
@@ -136,6 +245,7 @@ class ProcessController:
         })
 
         self.master, self.slave = os.openpty()
+        set_nonblocking(self.master)
         self.process = subprocess.Popen(command,
                                         stdin=self.slave,
                                         stdout=self.slave,
@@ -147,23 +257,62 @@ class ProcessController:
     def keep_reading(self):
         """Output thread method for the process
         
+        Stores the raw process output in the ring buffer, waiting
+        for the parsing thread
+        """
+        exited = False
+        while not self.stop:
+            if not self.output_buffer.free():
+                # The parser is late, wait for it
+                self.output_buffer.wait_space(timeout=1)
+                continue
+            readable, writable, executable = select.select([self.master] + ([] if exited else [self.exit_read]),
+                                                           [], [], 0 if exited else 5)
+            if self.exit_read in readable:
+                # Still read what the process wrote before exiting
+                exited = True
+            if self.master in readable:
+                """ We read the new content """
+                try:
+                    with profile("read"):
+                        count = self.output_buffer.read_from(self.master)
+                except BlockingIOError:
+                    pass
+                except OSError:
+                    break
+                else:
+                    trace(Stage.READ)
+                    self.output_transcoder.activity.notify()
+                    if self.recorder is not None and count:
+                        self.recorder.record_output(self.output_buffer.tail(count))
+            elif exited:
+                break
+        self.stop = True
+        os.close(self.exit_read)
+        # Wake up the parsing thread
+        self.output_buffer.close()
+
+    def keep_parsing(self):
+        """Parsing thread method for the process
+
         Sends the process output to the ViewController (through OutputTranscoder)
         """
         while True:
-            if self.stop:
-                break
-            ret = self.process.poll()
-            if ret is not None:
-                self.stop = True
-            readable, writable, executable = select.select([self.master], [], [], 5)
-            if readable:
-                """ We read the new content """
-                data = os.read(self.master, 1024)
-                text = data.decode('UTF-8', errors='replace')
-                log_debug("RAW", repr(text))
-                log_debug("PID", os.getenv('BASHPID'))
-                self.output_transcoder.decode(text)
-            #                log_debug("{} >> {}".format(int(time.time()), repr(text)))
+            if not self.output_buffer.wait_data(timeout=1):
+                if self.stop:
+                    break
+                continue
+            self.parse_output()
+        # Everything the process wrote has been decoded
+        self.output_transcoder.activity.close()
+
+    def keep_waiting(self):
+        """Exit thread method for the process
+
+        Wakes up the reading thread as soon as the process exits
+        """
+        self.process.wait()
+        os.close(self.exit_write)
 
     def keep_writing(self):
         """Input thread method for the process
@@ -173,27 +322,279 @@ class ProcessController:
         while True:
             if self.stop:
                 break
-            ret = self.process.poll()
-            if ret is not None:
-                self.stop = True
-            readable, writable, executable = select.select([], [self.master], [], 5)
-            if writable:
+            if self.process.poll() is not None:
+                # The reading thread stops once it has read everything
+                break
+            try:
+                has_pending_writes = self.flush_inputs()
+            except OSError:
+                log_debug("Could not send input to a closed process")
+                break
+            if has_pending_writes:
+                # Wait for the process to read its input, or for
+                # a priority input to be queued
+                if self.paste_throttled:
+                    waited = ([self.wakeup_read], [], [], self.paste_poll_interval)
+                else:
+                    waited = ([self.wakeup_read], [self.master], [], 1)
+                readable, writable, executable = select.select(*waited)
+                if readable:
+                    try:
+                        os.read(self.wakeup_read, 512)
+                    except BlockingIOError:
+                        pass
+            else:
                 try:
-                    (input_type, content) = self.input_transcoder.pop_input(timeout=1)
+                    self.input_backlog.append(self.input_transcoder.pop_input(timeout=1))
                 except Empty:
                     pass
-                else:
-                    if input_type == 0:
-                        log_debug("Sending input\n<< {}".format(repr(content)))
-                        data = content.encode('UTF-8')
-                        #                        data = bytes(chaine, 'iso-8859-15')
-                        while data:
-                            chars_written = os.write(self.master, data)
-                            data = data[chars_written:]
-                    elif input_type == 1:
-                        (signal_type, signal_content) = content
-                        t = fcntl.ioctl(self.master, signal_type, signal_content)
-                        log_debug(struct.unpack('HHHH', t))
-                    elif input_type == 2:
-                        os.killpg(os.getpgid(self.process.pid), content)
-                        log_debug("SENDING SIGNAL TO PROCESS", content)
+        self.close_wakeup()
+
+    def wakeup(self):
+        try:
+            os.write(self.wakeup_write, b'\0')
+        except (BlockingIOError, OSError, TypeError):
+            pass
+
+    def close_wakeup(self):
+        self.input_transcoder.on_input = None
+        (wakeup_read, wakeup_write) = (self.wakeup_read, self.wakeup_write)
+        self.wakeup_read = self.wakeup_write = None
+        os.close(wakeup_read)
+        os.close(wakeup_write)
+
+    def flush_inputs(self):
+        """Sends as much of the queued user inputs as the PTY accepts
+
+        Every text input queued is coalesced in a single write, the
+        ioctls and signals are handled once the text queued before
+        them has been written
+
+        The inputs of the priority lane are sent first, without waiting
+        for the previous ones
+
+        A paste is streamed chunk by chunk, and the inputs queued after
+        it wait for its end
+
+        Returns:
+            bool -- True if some input is waiting for the PTY to be writable,
+                    or for the process to read its input if `paste_throttled`
+        """
+        self.paste_throttled = False
+        priority_inputs = self.input_transcoder.pop_priority_inputs()
+        self.input_backlog.extend(self.input_transcoder.pop_inputs())
+        for (input_type, content) in priority_inputs:
+            self.handle_priority_input(input_type, content)
+        while True:
+            while self.input_backlog and self.input_backlog[0][0] == 0 and not self.paste_chunks:
+                content = self.input_backlog.popleft()[1]
+                log_debug("Sending input\n<< {}".format(repr(content)))
+                self.write_buffer += content.encode('UTF-8')
+            if self.write_buffer and not self.write_pending():
+                return True
+            if self.paste_chunks:
+                # The tty takes some time to queue what has been written,
+                # so there is at least one poll interval between two chunks
+                if self.paste_sent_at is not None and (
+                        time.time() - self.paste_sent_at < self.paste_poll_interval or self.tty_input_size() > 0):
+                    self.paste_throttled = True
+                    return True
+                self.write_buffer += self.paste_chunks.popleft()
+                self.paste_sent_at = time.time()
+                if not self.paste_chunks:
+                    self.paste_end = b''
+                    self.paste_sent_at = None
+                continue
+            if not self.input_backlog:
+                return False
+            (input_type, content) = self.input_backlog.popleft()
+            if input_type == 5:
+                self.start_paste(*content)
+            else:
+                self.handle_input(input_type, content)
+
+    def start_paste(self, content, bracketed):
+        """Splits a paste into chunks of at most `paste_chunk_size` bytes
+
+        Chunks end on a line break when possible, so that a line does
+        not have to wait for the next chunk to be read by the process
+        """
+        data = content.encode('UTF-8')
+        if bracketed:
+            data = b'\x1b[200~' + data + b'\x1b[201~'
+            self.paste_end = b'\x1b[201~'
+        log_debug("Pasting", len(data), "bytes")
+        while data:
+            size = self.paste_chunk_size
+            if len(data) > size:
+                line_end = data.rfind(b'\n', 0, size)
+                if line_end >= 0:
+                    size = line_end + 1
+            self.paste_chunks.append(data[:size])
+            data = data[size:]
+
+    def tty_input_size(self):
+        """Returns the count of bytes the process has not read yet from its tty"""
+        try:
+            return struct.unpack('i', fcntl.ioctl(self.slave, termios.FIONREAD, b'\0\0\0\0'))[0]
+        except OSError:
+            return 0
+
+    def handle_priority_input(self, input_type, content):
+        """Sends an input of the priority lane ahead of the queued ones
+
+        Like the tty does with its input queue, an interrupting
+        character or signal discards the text not sent yet
+        """
+        if input_type == 0 or (input_type == 2 and content in (signal.SIGINT, signal.SIGQUIT, signal.SIGTSTP)):
+            log_debug("Discarding pending input", len(self.write_buffer))
+            self.write_buffer.clear()
+            self.input_backlog = deque(i for i in self.input_backlog if i[0] not in (0, 5))
+            self.paste_chunks.clear()
+            self.paste_sent_at = None
+            # Let the application leave its paste mode
+            self.write_buffer += self.paste_end
+            self.paste_end = b''
+        if input_type == 0:
+            data = content.encode('UTF-8')
+            if self.write_buffer:
+                self.write_buffer += data
+                self.write_pending()
+                return
+            try:
+                os.write(self.master, data)
+                trace(Stage.WRITE)
+                if self.recorder is not None:
+                    self.recorder.record_input(data)
+            except BlockingIOError:
+                # The tty is full, send the signal the character stands for
+                signal_number = self.interrupt_signals.get(content)
+                try:
+                    foreground = os.tcgetpgrp(self.master)
+                except OSError:
+                    foreground = 0
+                if foreground <= 0 or foreground == os.getpgrp():
+                    # The tty is not the controlling terminal of the process
+                    foreground = os.getpgid(self.process.pid)
+                os.killpg(foreground, signal_number)
+        else:
+            self.handle_input(input_type, content)
+
+    def write_pending(self):
+        """Writes the write buffer to the PTY until it would block
+
+        Returns:
+            bool -- True if the whole buffer has been written
+        """
+        while self.write_buffer:
+            try:
+                chars_written = os.write(self.master, self.write_buffer)
+            except BlockingIOError:
+                return False
+            if self.recorder is not None:
+                self.recorder.record_input(self.write_buffer[:chars_written])
+            del self.write_buffer[:chars_written]
+            trace(Stage.WRITE)
+        return True
+
+    def parse_output(self, limit=-1):
+        """Decodes the raw output of the ring buffer into the OutputTranscoder
+
+        The available spans are parsed as a single batch
+
+        Keyword Arguments:
+            limit {int} -- Maximum count of bytes to parse (default: {-1}, everything)
+
+        Returns:
+            int -- count of bytes parsed
+        """
+        spans = self.output_buffer.spans(limit)
+        text = ''.join([self.decoder.decode(span) for span in spans])
+        count = sum(len(span) for span in spans)
+        self.output_buffer.consume(count)
+        if text:
+            log_debug("RAW", repr(text))
+            self.output_transcoder.decode(text)
+        return count
+
+    def handle_input(self, input_type, content):
+        """Sends one user input (from InputTranscoder) to the process"""
+        if input_type == 0:
+            self.input_backlog.append((input_type, content))
+            self.flush_inputs()
+        elif input_type == 1:
+            (signal_type, signal_content) = content
+            t = fcntl.ioctl(self.master, signal_type, signal_content)
+            log_debug(struct.unpack('HHHH', t))
+            if self.recorder is not None and signal_type == termios.TIOCSWINSZ:
+                self.recorder.record_size(signal_content)
+        elif input_type == 2:
+            os.killpg(os.getpgid(self.process.pid), content)
+            log_debug("SENDING SIGNAL TO PROCESS", content)
+
+    ##################
+    # Reactor session
+    ##################
+
+    def fileno(self):
+        return self.master
+
+    def on_readable(self):
+        """Reads the PTY from the reactor thread
+
+        Only stores the raw bytes, the parsing is done by `process_pending`
+        in a reactor worker
+
+        Returns:
+            bool -- False if the PTY has been closed
+        """
+        with self.mutex:
+            if not self.output_buffer.free():
+                # Stop watching the PTY until a worker made some room
+                self.paused = True
+                self.reactor.pause(self)
+                return True
+        with profile("read"):
+            count = self.output_buffer.read_from(self.master)
+        trace(Stage.READ)
+        self.output_transcoder.activity.notify()
+        if self.recorder is not None and count:
+            self.recorder.record_output(self.output_buffer.tail(count))
+        return count > 0
+
+    def process_pending(self, budget):
+        """Handles a slice of the session work from a reactor worker
+
+        Sends every queued user input, then parses at most `budget`
+        bytes of the process output
+
+        Returns:
+            bool -- True if some output is still waiting to be parsed
+        """
+        try:
+            has_pending_writes = self.flush_inputs()
+        except OSError:
+            log_debug("Could not send input to a closed process")
+            has_pending_writes = False
+        if has_pending_writes and self.paste_throttled:
+            # Nothing tells when the process reads its input, check again later
+            self.reactor.call_later(self.paste_poll_interval, self.reactor.schedule, self)
+            has_pending_writes = False
+        if has_pending_writes != self.watching_writable:
+            self.watching_writable = has_pending_writes
+            self.reactor.watch_writable(self, has_pending_writes)
+
+        if self.parse_output(budget):
+            with self.mutex:
+                if self.paused:
+                    self.paused = False
+                    self.reactor.resume(self)
+        if len(self.output_buffer) > 0:
+            return True
+        if self.stop:
+            self.output_transcoder.activity.close()
+        return False
+
+    def on_closed(self):
+        self.stop = True
+        self.reactor.schedule(self)
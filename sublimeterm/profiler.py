@@ -0,0 +1,137 @@
+# Copyright (C) 2016-2017 Perceval Wajsburt <perceval.wajsburt@gmail.com>
+#
+# This module is part of SublimeTerm and is released under
+# the MIT License: http://www.opensource.org/licenses/mit-license.php
+
+"""
+Output pipeline profiler
+
+Records a span for each stage of the output pipeline (PTY read, decode,
+end_sequence, pop_output, compute_correction, term_editor) and exports
+them in the Chrome trace-event format, to be opened in chrome://tracing
+or https://ui.perfetto.dev
+
+Every thread appends its spans to its own bounded buffer, so that
+recording never takes a lock shared with the other pipeline threads.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from threading import Lock
+
+__all__ = ['Profiler', 'profile']
+
+
+class Span:
+    __slots__ = ('events', 'name', 'start')
+
+    def __init__(self, events, name):
+        self.events = events
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.events.append((self.name, self.start, time.perf_counter()))
+
+
+class NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+NULL_SPAN = NullSpan()
+
+
+class Profiler:
+    """Collects the pipeline spans of every thread
+
+    There is at most one running profiler, `Profiler.instance`, which
+    can be started and stopped at runtime. While it is stopped,
+    `profile` returns a shared span that does nothing.
+    """
+
+    instance = None
+
+    def __init__(self, max_events=100000):
+        # Maximum count of spans kept by thread, the oldest are dropped
+        self.max_events = max_events
+        self.local = threading.local()
+        # (thread id, thread name, events) of every thread that recorded a span,
+        # only locked when a thread records its first span
+        self.buffers = []
+        self.buffers_mutex = Lock()
+        self.origin = time.perf_counter()
+
+    @classmethod
+    def start(cls, **kwargs):
+        """Starts profiling, if it is not already done
+
+        Returns:
+            Profiler -- the running profiler
+        """
+        if cls.instance is None:
+            cls.instance = cls(**kwargs)
+        return cls.instance
+
+    @classmethod
+    def stop(cls):
+        """Stops profiling
+
+        Returns:
+            Profiler -- the stopped profiler, that still holds the spans, or None
+        """
+        profiler = cls.instance
+        cls.instance = None
+        return profiler
+
+    def events(self):
+        """Returns the span buffer of the current thread"""
+        try:
+            return self.local.events
+        except AttributeError:
+            events = self.local.events = deque(maxlen=self.max_events)
+            thread = threading.current_thread()
+            with self.buffers_mutex:
+                self.buffers.append((thread.ident, thread.name, events))
+            return events
+
+    def span(self, name):
+        return Span(self.events(), name)
+
+    def trace_events(self):
+        """Returns the spans as Chrome trace events"""
+        pid = os.getpid()
+        with self.buffers_mutex:
+            buffers = list(self.buffers)
+        trace_events = []
+        for (tid, thread_name, events) in buffers:
+            trace_events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                                 "args": {"name": thread_name}})
+            for (name, start, end) in list(events):
+                trace_events.append({"name": name, "cat": "sublimeterm", "ph": "X", "pid": pid, "tid": tid,
+                                     "ts": (start - self.origin) * 1e6, "dur": (end - start) * 1e6})
+        return trace_events
+
+    def dump(self, path):
+        """Writes the spans to a Chrome trace-event JSON file"""
+        with open(path, 'w') as f:
+            json.dump({"traceEvents": self.trace_events(), "displayTimeUnit": "ms"}, f)
+
+
+def profile(name):
+    """Returns a context manager recording a span named `name` if profiling is running"""
+    profiler = Profiler.instance
+    if profiler is None:
+        return NULL_SPAN
+    return profiler.span(name)
@@ -0,0 +1,296 @@
+# Copyright (C) 2016-2017 Perceval Wajsburt <perceval.wajsburt@gmail.com>
+#
+# This module is part of SublimeTerm and is released under
+# the MIT License: http://www.opensource.org/licenses/mit-license.php
+
+import heapq
+import itertools
+import logging
+import os
+import selectors
+import time
+from collections import deque
+from threading import Condition, Lock, Thread
+
+from .utils import *
+
+logger = logging.getLogger()
+
+
+def log_debug(*args):
+    logger.debug(" ".join(map(str, args)))
+
+
+__all__ = ['Reactor']
+
+
+class Reactor:
+    """Shared I/O loop for every terminal session
+
+    A single thread waits on all the PTY masters at once (epoll on
+    Linux, kqueue on OS X, through `selectors`) and a small pool of
+    workers processes the sessions that have pending work.
+
+    A session must provide:
+        fileno()                -- the PTY master fd
+        on_readable()           -- called from the reactor thread when the fd
+                                   is readable, returns False at EOF
+        process_pending(budget) -- called from a worker, handles at most
+                                   `budget` bytes of output and returns True
+                                   if some work is still pending
+        on_closed()             -- called once the session has been
+                                   unregistered
+
+    Sessions are scheduled round-robin: a session that still has work
+    after its slice goes back to the end of the run queue, so that a
+    flooding session cannot starve the keystroke echo of another one.
+    """
+
+    shared_instance = None
+
+    def __init__(self, workers=2, budget=4096):
+        self.workers = workers
+        self.budget = budget
+
+        self.selector = selectors.DefaultSelector()
+        self.sessions = {}
+        # Events watched for each session fd
+        self.interests = {}
+
+        # Sessions waiting for a worker, and the set of sessions
+        # that are either in this queue or being processed
+        self.run_queue = deque()
+        self.scheduled = set()
+        self.rescheduled = set()
+        self.run_condition = Condition(Lock())
+
+        # Self-pipe used to wake up the reactor thread when
+        # the registered sessions change
+        self.wakeup_read, self.wakeup_write = os.pipe()
+        set_nonblocking(self.wakeup_read)
+        set_nonblocking(self.wakeup_write)
+        self.selector.register(self.wakeup_read, selectors.EVENT_READ, None)
+        self.pending_changes = deque()
+
+        # Heap of (deadline, sequence, callback, args) timers
+        self.timers = []
+        self.timer_sequence = itertools.count()
+
+        self.reactor_thread = None
+        self.worker_threads = []
+        self.stop = False
+
+    @classmethod
+    def shared(cls, workers=2, budget=4096):
+        """Returns the reactor shared by all the sessions, and starts it if needed"""
+        if cls.shared_instance is None or cls.shared_instance.stop:
+            cls.shared_instance = cls(workers=workers, budget=budget)
+            cls.shared_instance.start()
+        return cls.shared_instance
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def start(self):
+        """Starts the reactor thread and the workers"""
+        self.reactor_thread = Thread(target=self.keep_polling, daemon=True)
+        self.reactor_thread.start()
+        for i in range(self.workers):
+            worker = Thread(target=self.keep_working, daemon=True)
+            worker.start()
+            self.worker_threads.append(worker)
+
+    def close(self):
+        """Stops the reactor thread and the workers"""
+        self.stop = True
+        self.wakeup()
+        with self.run_condition:
+            self.run_condition.notify_all()
+        if Reactor.shared_instance is self:
+            Reactor.shared_instance = None
+
+    def register(self, session):
+        """Starts watching the session PTY"""
+        self.pending_changes.append(('register', session))
+        self.wakeup()
+
+    def unregister(self, session):
+        """Stops watching the session PTY"""
+        self.pending_changes.append(('unregister', session))
+        self.wakeup()
+
+    def pause(self, session):
+        """Stops watching the session PTY for a while, when it cannot store more output"""
+        self.pending_changes.append(('pause', session))
+        self.wakeup()
+
+    def resume(self, session):
+        """Watches again a paused session PTY"""
+        self.pending_changes.append(('resume', session))
+        self.wakeup()
+
+    def watch_writable(self, session, enabled=True):
+        """Schedules the session when its PTY becomes writable
+
+        Used while some input is waiting for room in the tty buffer
+        """
+        self.pending_changes.append(('write' if enabled else 'nowrite', session))
+        self.wakeup()
+
+    def call_later(self, delay, callback, *args):
+        """Calls `callback(*args)` from the reactor thread after `delay` seconds"""
+        self.pending_changes.append(('timer', (time.time() + delay, next(self.timer_sequence), callback, args)))
+        self.wakeup()
+
+    def run_timers(self):
+        """Runs the expired timers
+
+        Returns:
+            float -- delay until the next timer, or 5 if there is none
+        """
+        now = time.time()
+        while self.timers and self.timers[0][0] <= now:
+            (deadline, sequence, callback, args) = heapq.heappop(self.timers)
+            callback(*args)
+        if self.timers:
+            return max(0, min(5, self.timers[0][0] - now))
+        return 5
+
+    def wakeup(self):
+        try:
+            os.write(self.wakeup_write, b'\0')
+        except (BlockingIOError, OSError):
+            pass
+
+    def schedule(self, session):
+        """Puts the session in the run queue if it is not already there
+
+        Can be called from any thread, for example when a user input
+        has been queued for the session
+        """
+        with self.run_condition:
+            if session in self.scheduled:
+                # Processed right now: make sure it runs once more
+                self.rescheduled.add(session)
+                return
+            self.scheduled.add(session)
+            self.run_queue.append(session)
+            self.run_condition.notify()
+
+    def apply_changes(self):
+        while self.pending_changes:
+            (change, session) = self.pending_changes.popleft()
+            if change == 'timer':
+                heapq.heappush(self.timers, session)
+                continue
+            fd = session.fileno()
+            if change == 'register':
+                if fd not in self.sessions:
+                    self.sessions[fd] = session
+                    self.interests[fd] = selectors.EVENT_READ
+                    self.selector.register(fd, selectors.EVENT_READ, session)
+                continue
+            if fd not in self.sessions:
+                continue
+            if change == 'unregister':
+                self.forget(fd)
+                session.on_closed()
+                continue
+            events = self.interests[fd]
+            if change == 'pause':
+                events &= ~selectors.EVENT_READ
+            elif change == 'resume':
+                events |= selectors.EVENT_READ
+            elif change == 'write':
+                events |= selectors.EVENT_WRITE
+            elif change == 'nowrite':
+                events &= ~selectors.EVENT_WRITE
+            self.watch(fd, session, events)
+
+    def watch(self, fd, session, events):
+        """Updates the events the selector waits for on `fd`"""
+        registered = fd in self.selector.get_map()
+        self.interests[fd] = events
+        if not events:
+            if registered:
+                self.selector.unregister(fd)
+        elif registered:
+            self.selector.modify(fd, events, session)
+        else:
+            self.selector.register(fd, events, session)
+
+    def forget(self, fd):
+        self.sessions.pop(fd, None)
+        self.interests.pop(fd, None)
+        if fd in self.selector.get_map():
+            self.selector.unregister(fd)
+
+    def keep_polling(self):
+        """Reactor thread method
+
+        Waits for readable (or writable, when some input is waiting)
+        PTYs and schedules their sessions
+        """
+        while not self.stop:
+            self.apply_changes()
+            timeout = self.run_timers()
+            for (key, events) in self.selector.select(timeout=timeout):
+                session = key.data
+                if session is None:
+                    try:
+                        while os.read(self.wakeup_read, 512):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    continue
+                alive = True
+                if events & selectors.EVENT_READ:
+                    try:
+                        alive = session.on_readable()
+                    except BlockingIOError:
+                        pass
+                    except OSError:
+                        # EIO is what Linux returns once the slave side is closed
+                        alive = False
+                if alive:
+                    self.schedule(session)
+                else:
+                    log_debug("SESSION ENDED", key.fd)
+                    self.forget(key.fd)
+                    # Let a worker flush what has been read before the EOF
+                    self.schedule(session)
+                    session.on_closed()
+        for session in self.sessions.values():
+            session.on_closed()
+        self.selector.close()
+        os.close(self.wakeup_read)
+        os.close(self.wakeup_write)
+
+    def keep_working(self):
+        """Worker thread method
+
+        Processes one slice of work of the first scheduled session
+        """
+        while True:
+            with self.run_condition:
+                while not self.run_queue and not self.stop:
+                    self.run_condition.wait()
+                if self.stop:
+                    break
+                session = self.run_queue.popleft()
+            try:
+                has_more = session.process_pending(self.budget)
+            except Exception:
+                logger.exception("Session processing failed")
+                has_more = False
+            with self.run_condition:
+                if has_more or session in self.rescheduled:
+                    self.rescheduled.discard(session)
+                    self.run_queue.append(session)
+                    self.run_condition.notify()
+                else:
+                    self.scheduled.discard(session)
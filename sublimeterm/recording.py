@@ -0,0 +1,195 @@
+# Copyright (C) 2016-2017 Perceval Wajsburt <perceval.wajsburt@gmail.com>
+#
+# This module is part of SublimeTerm and is released under
+# the MIT License: http://www.opensource.org/licenses/mit-license.php
+
+"""
+Session recording and replay
+
+A recording is an append-only binary file: a header, then one record
+per PTY read, PTY write or resize:
+
+    kind (1 byte), timestamp (8 bytes float, seconds since the start),
+    payload length (4 bytes), payload
+
+The timestamps come from a monotonic clock. A recording cut by a crash
+can still be replayed up to its last complete record.
+
+Replaying a recording of a real session (vim, htop, a build...) into an
+ANSIOutputTranscoder reproduces its parsing work without the original
+environment:
+
+    python -m sublimeterm.recording session.strec [--realtime]
+"""
+
+import codecs
+import logging
+import struct
+import sys
+import time
+from collections import deque
+from threading import Event, Thread
+
+logger = logging.getLogger()
+
+
+def log_debug(*args):
+    logger.debug(" ".join(map(str, args)))
+
+
+__all__ = ['SessionRecorder', 'read_recording', 'replay']
+
+MAGIC = b'STREC\x01'
+RECORD_HEADER = struct.Struct('<BdI')
+
+# Record kinds
+OUTPUT = 0
+INPUT = 1
+SIZE = 2
+
+
+class SessionRecorder:
+    """Writes a session recording from a background thread
+
+    The record methods only append to a queue, so that the read loop
+    of the ProcessController never waits for the disk
+    """
+
+    def __init__(self, path, buffering=65536):
+        self.path = path
+        self.file = open(path, 'ab', buffering=buffering)
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+        self.origin = time.monotonic()
+        self.records = deque()
+        self.records_event = Event()
+        self.closed = False
+        self.write_thread = Thread(target=self.keep_writing, daemon=True)
+        self.write_thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def record(self, kind, payload):
+        if self.closed:
+            return
+        self.records.append((kind, time.monotonic() - self.origin, bytes(payload)))
+        self.records_event.set()
+
+    def record_output(self, data):
+        """Records bytes read from the PTY"""
+        self.record(OUTPUT, data)
+
+    def record_input(self, data):
+        """Records bytes written to the PTY"""
+        self.record(INPUT, data)
+
+    def record_size(self, winsize):
+        """Records a resize, `winsize` being the packed TIOCSWINSZ argument"""
+        self.record(SIZE, winsize)
+
+    def keep_writing(self):
+        """Write thread method
+
+        Flushes the queued records to the file
+        """
+        while True:
+            self.records_event.wait(timeout=1)
+            self.records_event.clear()
+            closed = self.closed
+            while self.records:
+                (kind, timestamp, payload) = self.records.popleft()
+                self.file.write(RECORD_HEADER.pack(kind, timestamp, len(payload)))
+                self.file.write(payload)
+            self.file.flush()
+            if closed:
+                break
+        self.file.close()
+
+    def close(self):
+        """Writes the remaining records and closes the file"""
+        if self.closed:
+            return
+        self.closed = True
+        self.records_event.set()
+        self.write_thread.join()
+
+
+def read_recording(path):
+    """Iterates over the records of a recording
+
+    Yields:
+        (int, float, bytes) -- kind, timestamp and payload of each record
+
+    Raises:
+        ValueError -- The file is not a recording
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("{} is not a session recording".format(path))
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                break
+            (kind, timestamp, size) = RECORD_HEADER.unpack(header)
+            payload = f.read(size)
+            if len(payload) < size:
+                log_debug("Truncated recording", path)
+                break
+            yield (kind, timestamp, payload)
+
+
+def replay(path, output_transcoder, realtime=False, speed=1.):
+    """Feeds the output of a recording into an output transcoder
+
+    Arguments:
+        path {str} -- recording file
+        output_transcoder {OutputTranscoder} -- the transcoder that parses the output
+
+    Keyword Arguments:
+        realtime {bool} -- Wait between the records as in the recorded session,
+                           instead of replaying at full speed (default: {False})
+        speed {number} -- Speed factor of the real time replay (default: {1.})
+
+    Returns:
+        dict -- count of output bytes and records, and the replay duration in seconds
+    """
+    decoder = codecs.getincrementaldecoder('UTF-8')(errors='replace')
+    output_bytes = 0
+    output_records = 0
+    start = time.monotonic()
+    for (kind, timestamp, payload) in read_recording(path):
+        if realtime:
+            delay = timestamp / speed - (time.monotonic() - start)
+            if delay > 0:
+                time.sleep(delay)
+        if kind == OUTPUT:
+            text = decoder.decode(payload)
+            if text:
+                output_transcoder.decode(text)
+            output_bytes += len(payload)
+            output_records += 1
+        elif kind == SIZE:
+            (h, w, ph, pw) = struct.unpack('HHHH', payload)
+            output_transcoder.set_size(w, h, pw, ph)
+    return {
+        "bytes": output_bytes,
+        "records": output_records,
+        "duration": time.monotonic() - start,
+    }
+
+
+def main(args):
+    from .ansi_output_transcoder import ANSIOutputTranscoder
+
+    stats = replay(args[0], ANSIOutputTranscoder(), realtime="--realtime" in args)
+    print("{records} records, {bytes} bytes in {duration:.3f}s".format(**stats))
+    if stats["duration"] > 0:
+        print("{:.1f} kB/s".format(stats["bytes"] / stats["duration"] / 1000))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
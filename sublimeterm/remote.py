@@ -0,0 +1,387 @@
+# Copyright (C) 2016-2017 Perceval Wajsburt <perceval.wajsburt@gmail.com>
+#
+# This module is part of SublimeTerm and is released under
+# the MIT License: http://www.opensource.org/licenses/mit-license.php
+
+"""
+Out-of-process parsing
+
+The process and the ANSI parsing run in a helper process, so that a heavy
+output stream does not hold the GIL of the Sublime Text plugin host.
+The helper only sends back damage records, ie the output of
+`OutputTranscoder.pop_output`, that are applied to a mirror of the buffer.
+
+Plugin host                              Helper process
+InputTranscoder -> RemoteProcessController ==stdin==> ProcessController
+RemoteOutputTranscoder <- RemoteProcessController <==stdout== ANSIOutputTranscoder
+
+Every message is a frame: tag (1 byte), payload length (4 bytes), payload
+"""
+
+import json
+import logging
+import os
+import struct
+import subprocess
+import sys
+from threading import Event, Lock, Thread
+
+from .activity import *
+from .ansi_output_transcoder import *
+from .input_transcoder import *
+from .latency import *
+from .profiler import *
+from .process_controller import *
+
+try:
+    from Queue import Queue, Empty
+except ImportError:
+    from queue import Queue, Empty  # python 3.x
+
+logger = logging.getLogger()
+
+
+def log_debug(*args):
+    logger.debug(" ".join(map(str, args)))
+
+
+__all__ = ['RemoteOutputTranscoder', 'RemoteProcessController']
+
+# Plugin -> helper
+TAG_TEXT = 0
+TAG_IOCTL = 1
+TAG_SIGNAL = 2
+TAG_SIZE = 3
+TAG_CLOSE = 4
+TAG_PASTE = 5
+# Helper -> plugin
+TAG_DAMAGE = 10
+TAG_EXIT = 11
+
+FRAME_HEADER = struct.Struct('<BI')
+IOCTL_HEADER = struct.Struct('<Q')
+SIGNAL_PAYLOAD = struct.Struct('<i')
+SIZE_PAYLOAD = struct.Struct('<IIII')
+DAMAGE_HEADER = struct.Struct('<iiiiiB')
+
+FLAG_ASB = 1
+FLAG_BRACKETED_PASTE = 2
+
+
+def write_frame(stream, tag, payload=b''):
+    stream.write(FRAME_HEADER.pack(tag, len(payload)) + payload)
+
+
+def read_exactly(stream, size):
+    chunks = []
+    while size:
+        chunk = stream.read(size)
+        if not chunk:
+            raise EOFError
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def read_frame(stream):
+    """Reads a frame from a binary stream
+
+    Returns:
+        (int, bytes) -- tag and payload of the frame
+
+    Raises:
+        EOFError -- The stream has been closed
+    """
+    (tag, size) = FRAME_HEADER.unpack(read_exactly(stream, FRAME_HEADER.size))
+    return (tag, read_exactly(stream, size))
+
+
+def encode_damage(output, flags):
+    (content, begin, cursor, end, delta, size) = output
+    return DAMAGE_HEADER.pack(begin, cursor, end, delta, size, flags) + content.encode('UTF-8')
+
+
+def decode_damage(payload):
+    (begin, cursor, end, delta, size, flags) = DAMAGE_HEADER.unpack_from(payload)
+    content = payload[DAMAGE_HEADER.size:].decode('UTF-8')
+    return (content, begin, cursor, end, delta, size, flags)
+
+
+class RemoteOutputTranscoder:
+    """Mirror of an OutputTranscoder living in the helper process
+
+    Offers the same reading interface as the OutputTranscoder
+    (pop_output, get_between, content_size, asb_mode) to the view
+    controller, but its content is only updated through the damage
+    records sent by the helper.
+    """
+
+    def __init__(self):
+        self.content = []
+        self.content_size = 0
+        self.last_content_size = 0
+        self.cursor = 0
+        self.asb_mode = False
+        self.bracketed_paste = False
+
+        # Changes since the last `pop_output`
+        self.min_seq_cursor = 0
+        self.max_seq_cursor = 0
+        self.flushed = True
+
+        self.changed_event = Event()
+        self.io_mutex = Lock()
+
+        # Notified by every damage record, to wait for the output
+        self.activity = Activity()
+
+        self.max_lines = 5
+        # Called with the new size, set by the RemoteProcessController
+        self.on_resize = None
+
+    def set_size(self, w, h, pw, ph):
+        self.max_lines = h
+        if self.on_resize is not None:
+            self.on_resize(w, h, pw, ph)
+
+    def apply_damage(self, content, begin, cursor, end, delta, size, flags):
+        """Applies a damage record to the mirrored buffer
+
+        The region [begin, end - delta) of the previous content
+        is replaced by `content`, which ends at `end`.
+        """
+        with self.io_mutex:
+            self.content[begin:end - delta] = content
+            del self.content[size:]
+
+            if self.flushed:
+                self.min_seq_cursor = begin
+                self.max_seq_cursor = end
+                self.last_content_size = self.content_size
+            else:
+                # Express the pending changed region in the new coordinates
+                def shift(offset):
+                    if offset <= begin:
+                        return offset
+                    if offset >= end - delta:
+                        return offset + delta
+                    return end
+                self.min_seq_cursor = min(shift(self.min_seq_cursor), begin)
+                self.max_seq_cursor = max(shift(self.max_seq_cursor), end)
+            self.max_seq_cursor = min(self.max_seq_cursor, size)
+            self.min_seq_cursor = min(self.min_seq_cursor, self.max_seq_cursor)
+
+            self.cursor = cursor
+            self.content_size = size
+            self.asb_mode = bool(flags & FLAG_ASB)
+            self.bracketed_paste = bool(flags & FLAG_BRACKETED_PASTE)
+            self.flushed = False
+            self.changed_event.set()
+        self.activity.notify()
+
+    def pop_output(self, timeout=-1):
+        """Waits and return changes in the buffer
+
+        Same as `OutputTranscoder.pop_output`
+        """
+        if (timeout < 0 and not self.changed_event.is_set()) or not self.changed_event.wait(timeout=timeout):
+            raise Empty
+        with profile("pop_output"), self.io_mutex:
+            self.changed_event.clear()
+            self.flushed = True
+            return (''.join(self.content[self.min_seq_cursor:self.max_seq_cursor]), self.min_seq_cursor,
+                    self.cursor, self.max_seq_cursor, self.content_size - self.last_content_size,
+                    self.content_size)
+
+    def get_between(self, begin, end):
+        with self.io_mutex:
+            return ''.join(self.content[begin:end])
+
+    def wait_idle(self, quiet_ms=100, timeout=None):
+        return self.activity.wait_idle(quiet_ms, timeout)
+
+    def wait_for(self, pattern, timeout=None):
+        return self.activity.wait_for(self.get_content, pattern, timeout)
+
+    def get_content(self):
+        with self.io_mutex:
+            return ''.join(self.content)
+
+
+class RemoteProcessController(ProcessController):
+    """ProcessController whose process and parser run in a helper process
+
+    The output transcoder must be a RemoteOutputTranscoder
+    """
+
+    def __init__(self, input_transcoder, output_transcoder, command=None, cwd=None, env=None, python=None,
+                 record_path=None):
+        ProcessController.__init__(self, input_transcoder, output_transcoder, command=command, cwd=cwd, env=env)
+        # The session is recorded by the helper
+        self.helper_record_path = record_path
+        self.python = python or sys.executable
+        self.helper = None
+        self.size = None
+        self.send_mutex = Lock()
+        self.output_transcoder.on_resize = self.send_size
+
+    def spawn(self, command, cwd, env):
+        """Starts the helper process, which will spawn the real process"""
+        root = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
+        helper_env = os.environ.copy()
+        helper_env["PYTHONPATH"] = os.pathsep.join(filter(None, [root, helper_env.get("PYTHONPATH")]))
+        config = json.dumps({"command": command, "cwd": cwd, "env": env, "record_path": self.helper_record_path})
+        self.helper = subprocess.Popen([self.python, "-m", "sublimeterm.remote", config],
+                                       stdin=subprocess.PIPE,
+                                       stdout=subprocess.PIPE,
+                                       env=helper_env)
+        # Used by ProcessController.close to kill the process
+        self.process = self.helper
+        if self.size is not None:
+            self.send_size(*self.size)
+
+    def send(self, tag, payload=b''):
+        with self.send_mutex:
+            write_frame(self.helper.stdin, tag, payload)
+            self.helper.stdin.flush()
+
+    def send_size(self, w, h, pw, ph):
+        self.size = (w, h, pw, ph)
+        if self.helper is None:
+            return
+        try:
+            self.send(TAG_SIZE, SIZE_PAYLOAD.pack(w, h, pw, ph))
+        except (OSError, ValueError):
+            log_debug("Could not resize a closed helper")
+
+    def close(self):
+        """Stops the process controller
+
+        Asks the helper to kill the process and exit
+        """
+        self.stop = True
+        self.output_transcoder.activity.close()
+        try:
+            self.send(TAG_CLOSE)
+        except (OSError, ValueError):
+            log_debug("Helper must already be dead")
+        ProcessController.instance = None
+
+    def keep_reading(self):
+        """Output thread method
+
+        Applies the damage records of the helper to the mirror
+        """
+        stdout = self.helper.stdout
+        while True:
+            try:
+                (tag, payload) = read_frame(stdout)
+            except (EOFError, OSError, ValueError):
+                break
+            if tag == TAG_DAMAGE:
+                # The helper reads and parses in a single step
+                trace(Stage.READ)
+                self.output_transcoder.apply_damage(*decode_damage(payload))
+                trace(Stage.FLUSH)
+            elif tag == TAG_EXIT:
+                break
+        self.stop = True
+        self.output_transcoder.activity.close()
+        self.helper.wait()
+
+    def keep_parsing(self):
+        """The parsing is done by the helper"""
+        pass
+
+    def keep_writing(self):
+        """Input thread method
+
+        Forwards the user inputs (from InputTranscoder) to the helper
+        """
+        while not self.stop:
+            try:
+                (input_type, content) = self.input_transcoder.pop_input(timeout=1)
+            except Empty:
+                pass
+            else:
+                self.handle_input(input_type, content)
+        self.close_wakeup()
+
+    def handle_input(self, input_type, content):
+        """Forwards one user input to the helper"""
+        try:
+            if input_type == 0:
+                self.send(TAG_TEXT, content.encode('UTF-8'))
+            elif input_type == 1:
+                (signal_type, signal_content) = content
+                self.send(TAG_IOCTL, IOCTL_HEADER.pack(signal_type) + signal_content)
+            elif input_type == 2:
+                self.send(TAG_SIGNAL, SIGNAL_PAYLOAD.pack(content))
+            elif input_type == 5:
+                (text, bracketed) = content
+                self.send(TAG_PASTE, (b'\1' if bracketed else b'\0') + text.encode('UTF-8'))
+            trace(Stage.WRITE)
+        except (OSError, ValueError):
+            log_debug("Could not send input to a closed helper")
+
+
+def serve(config, stdin, stdout):
+    """Helper process main loop
+
+    Runs the process and the parser, reads the inputs from `stdin`
+    and writes the damage records to `stdout`
+    """
+    input_transcoder = InputTranscoder()
+    output_transcoder = ANSIOutputTranscoder()
+    controller = ProcessController(input_transcoder, output_transcoder,
+                                   command=config["command"], cwd=config["cwd"], env=config["env"],
+                                   record_path=config.get("record_path"))
+
+    def keep_receiving():
+        while True:
+            try:
+                (tag, payload) = read_frame(stdin)
+            except EOFError:
+                break
+            if tag == TAG_TEXT:
+                input_transcoder.write(payload.decode('UTF-8'))
+            elif tag == TAG_IOCTL:
+                (request,) = IOCTL_HEADER.unpack_from(payload)
+                input_transcoder.put((1, (request, payload[IOCTL_HEADER.size:])))
+            elif tag == TAG_SIGNAL:
+                input_transcoder.put((2, SIGNAL_PAYLOAD.unpack(payload)[0]))
+            elif tag == TAG_PASTE:
+                input_transcoder.paste(payload[1:].decode('UTF-8'), bracketed=payload[:1] == b'\1')
+            elif tag == TAG_SIZE:
+                output_transcoder.set_size(*SIZE_PAYLOAD.unpack(payload))
+            elif tag == TAG_CLOSE:
+                break
+        controller.stop = True
+
+    receiving_thread = Thread(target=keep_receiving, daemon=True)
+
+    controller.start()
+    receiving_thread.start()
+    try:
+        while True:
+            try:
+                output = output_transcoder.pop_output(timeout=0.1)
+            except Empty:
+                if controller.stop:
+                    break
+            else:
+                flags = FLAG_ASB if output_transcoder.asb_mode else 0
+                if output_transcoder.bracketed_paste:
+                    flags |= FLAG_BRACKETED_PASTE
+                write_frame(stdout, TAG_DAMAGE, encode_damage(output, flags))
+                stdout.flush()
+        write_frame(stdout, TAG_EXIT)
+        stdout.flush()
+    except (OSError, ValueError):
+        pass
+    finally:
+        controller.close()
+
+
+if __name__ == '__main__':
+    serve(json.loads(sys.argv[1]), sys.stdin.buffer, sys.stdout.buffer)
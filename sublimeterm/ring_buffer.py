@@ -0,0 +1,150 @@
+# Copyright (C) 2016-2017 Perceval Wajsburt <perceval.wajsburt@gmail.com>
+#
+# This module is part of SublimeTerm and is released under
+# the MIT License: http://www.opensource.org/licenses/mit-license.php
+
+import os
+from threading import Condition, Lock
+
+__all__ = ['RingBuffer']
+
+
+class RingBuffer:
+    """Fixed-capacity byte ring buffer
+
+    Hands the raw process output over from the reader to the parser
+    without allocating an object per read: the reader reads straight
+    into the free part of a preallocated buffer, and the parser reads
+    the filled part as contiguous memoryview spans.
+
+    Made for a single writer and a single reader. Any writable buffer
+    can be used as storage, for example an `mmap` to share the ring
+    with another process.
+    """
+
+    def __init__(self, capacity=65536, buffer=None):
+        if buffer is None:
+            buffer = bytearray(capacity)
+        self.buffer = buffer
+        self.view = memoryview(buffer)
+        self.capacity = len(self.view)
+
+        # Total count of bytes written and consumed since the creation,
+        # the positions in the buffer are these counts modulo the capacity
+        self.written = 0
+        self.consumed = 0
+        # The writer will not write anymore
+        self.closed = False
+
+        self.condition = Condition(Lock())
+
+    def __len__(self):
+        return self.written - self.consumed
+
+    def free(self):
+        """Returns the count of bytes that can be written"""
+        return self.capacity - (self.written - self.consumed)
+
+    def free_spans(self):
+        """Returns the writable part of the buffer as at most two memoryviews"""
+        start = self.written % self.capacity
+        end = start + self.free()
+        if end <= self.capacity:
+            return [self.view[start:end]] if end > start else []
+        return [self.view[start:], self.view[:end - self.capacity]]
+
+    def spans(self, limit=-1):
+        """Returns the filled part of the buffer as at most two memoryviews
+
+        Keyword Arguments:
+            limit {int} -- Maximum count of bytes to return (default: {-1}, everything)
+        """
+        size = len(self)
+        if 0 <= limit < size:
+            size = limit
+        start = self.consumed % self.capacity
+        end = start + size
+        if end <= self.capacity:
+            return [self.view[start:end]] if end > start else []
+        return [self.view[start:], self.view[:end - self.capacity]]
+
+    def tail(self, count):
+        """Returns a copy of the `count` last written bytes
+
+        Only valid from the writer, as long as these bytes have not
+        been overwritten
+        """
+        end = self.written % self.capacity
+        start = end - count
+        if start >= 0:
+            return bytes(self.view[start:end])
+        return bytes(self.view[start:]) + bytes(self.view[:end])
+
+    def read_from(self, fd):
+        """Reads from the file descriptor `fd` into the free part of the buffer
+
+        Returns:
+            int -- count of bytes read, 0 at EOF
+
+        Raises:
+            BufferError -- The buffer is full
+        """
+        spans = self.free_spans()
+        if not spans:
+            raise BufferError("Ring buffer is full")
+        count = os.readv(fd, spans)
+        self.commit(count)
+        return count
+
+    def write(self, data):
+        """Copies `data` in the buffer
+
+        Returns:
+            int -- count of bytes written, can be less than len(data) if the buffer is full
+        """
+        data = memoryview(data)
+        count = 0
+        for span in self.free_spans():
+            n = min(len(span), len(data) - count)
+            span[:n] = data[count:count + n]
+            count += n
+        self.commit(count)
+        return count
+
+    def commit(self, count):
+        with self.condition:
+            self.written += count
+            self.condition.notify_all()
+
+    def consume(self, count):
+        """Frees the `count` first bytes of the filled part"""
+        with self.condition:
+            self.consumed += min(count, len(self))
+            self.condition.notify_all()
+
+    def close(self):
+        """Tells the reader that nothing more will be written"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def wait_data(self, timeout=None):
+        """Waits until there is something to read
+
+        Returns at once once the buffer is empty and closed
+
+        Returns:
+            bool -- False if the buffer is still empty after `timeout`
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.written > self.consumed or self.closed, timeout)
+            return self.written > self.consumed
+
+    def wait_space(self, timeout=None):
+        """Waits until some bytes can be written
+
+        Returns:
+            bool -- False if the buffer is still full after `timeout`
+        """
+        with self.condition:
+            return self.condition.wait_for(lambda: self.free() > 0, timeout)
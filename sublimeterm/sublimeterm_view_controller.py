@@ -46,6 +46,8 @@ except ImportError:
 
 logger = logging.getLogger()
 from .input_transcoder import *
+from .latency import *
+from .profiler import *
 from .ansi_output_transcoder import *
 from .process_controller import *
 
@@ -113,6 +115,9 @@ class SublimetermViewController():
         self.settings = settings
         self.output_panel = output_panel
 
+        # Insertions at least this long are streamed as pastes
+        self.paste_threshold = settings.get("paste_threshold", 256) if settings else 256
+
         self.editing_thread = None
         self.listening_thread = None
 
@@ -181,6 +186,8 @@ class SublimetermViewController():
 
         self.compute_change_interval(last_position, new_position, delta)
         debug("HAS UNPROCESS INPUTS", self.has_unprocessed_inputs)
+        if delta != 0:
+            trace_keystroke()
         if delta > 0:
             # If the cursor moved forward, then some content has been added
             content = self.console.substr(sublime.Region(last_position, last_position + delta))
@@ -254,10 +261,21 @@ class SublimetermViewController():
 
         #        self.compute_change_interval(last_position, self.last_sel)
 
+        trace_keystroke()
         self.input_queue.put((0, char))
 
         self.no_input_event.set()
 
+    def write_control_character(self, char):
+        """ Write an interrupting control character
+
+        Bypasses the view input queue so that the character reaches
+        the priority lane of the InputTranscoder right away, even if
+        a big paste or many cursor moves are still being processed
+        """
+        trace_keystroke()
+        self.input_transcoder.write(char)
+
     def compute_change_interval(self, last_position, new_position, delta):
         """Compute where the changes of the process on the view
 
@@ -298,13 +316,15 @@ class SublimetermViewController():
         self.has_just_changed_view = True
         will_make_selection = pos == begin == end
         #        debug("POS0", self.console.sel()[0].a)
-        sublime_api.view_run_command(self.console.view_id, "term_editor", {
-            "action": 2,
-            "begin": begin,
-            "end": end,
-            "string": string,
-            "cursor": pos if will_make_selection else -1
-        })
+        with profile("term_editor"):
+            sublime_api.view_run_command(self.console.view_id, "term_editor", {
+                "action": 2,
+                "begin": begin,
+                "end": end,
+                "string": string,
+                "cursor": pos if will_make_selection else -1
+            })
+        trace(Stage.EDIT)
         #        pos = self.console.sel()[0].a
         debug("NEW SEL IN CONSOLE", ', '.join(["[{}, {}]".format(sel.a, sel.b) for sel in self.console.sel()]))
         debug("NEW CONSOLE SIZE", self.console.size())
@@ -497,7 +517,9 @@ class SublimetermViewController():
                     if cached_cursor_dep is not None and self.cache_cursor_dep is True:
                         self.input_transcoder.move(cached_cursor_dep)
                         cached_cursor_dep = None
-                    if action == 0:
+                    if action == 0 and len(content) >= self.paste_threshold:
+                        self.input_transcoder.paste(content, bracketed=self.output_transcoder.bracketed_paste)
+                    elif action == 0:
                         self.input_transcoder.write(content)
                     elif action == 1:
                         self.input_transcoder.erase(content)
@@ -598,7 +620,8 @@ class SublimetermViewController():
                 self.lock.acquire()
                 has_unprocessed_outputs = True
 
-                self.compute_correction(proc_mod_begin, proc_mod_end, proc_mod_delta, content)
+                with profile("compute_correction"):
+                    self.compute_correction(proc_mod_begin, proc_mod_end, proc_mod_delta, content)
                 # We replace the view content between those limits
 
                 #                if will_clean_to_min_change:
@@ -3,6 +3,10 @@
 # This module is part of SublimeTerm and is released under
 # the MIT License: http://www.opensource.org/licenses/mit-license.php
 
+import fcntl
+import os
+
+
 class SpecialChar:
     NEW_LINE = '\n'
     TAB = '\t'
@@ -14,3 +18,15 @@ class SpecialChar:
     LEFT = '\x1BOD'
     RIGHT = '\x1BOC'  # '\x1B[C'
     ESCAPE = '\x1B'
+    INTERRUPT = '\x03'
+    SUSPEND = '\x1A'
+    QUIT = '\x1C'
+
+    # Control characters the tty turns into signals
+    INTERRUPTS = (INTERRUPT, SUSPEND, QUIT)
+
+
+def set_nonblocking(fd):
+    """Switches the file descriptor `fd` to non-blocking mode"""
+    flags = fcntl.fcntl(fd, fcntl.F_GETFL)
+    fcntl.fcntl(fd, fcntl.F_SETFL, flags | os.O_NONBLOCK)
@@ -0,0 +1,189 @@
+# Copyright (C) 2016-2017 Perceval Wajsburt <perceval.wajsburt@gmail.com>
+#
+# This module is part of SublimeTerm and is released under
+# the MIT License: http://www.opensource.org/licenses/mit-license.php
+
+"""
+Headless end-to-end harness
+
+Runs the whole pipeline, PTY -> ProcessController -> ANSIOutputTranscoder
+-> SublimetermViewController -> view, against the in-memory fake of the
+Sublime Text API (tests/sublime_api). The plugin is loaded like Sublime
+Text does, as the "Term" package, so that its TermEditorCommand and
+TermListener are the ones driving the fake view.
+
+    with Harness(["/bin/sh"], latency=0.001) as harness:
+        harness.type("echo hello")
+        harness.press("enter")
+        harness.wait_for_text("hello\\n")
+
+Running this file prints the throughput and the keystroke echo latency
+of the headless pipeline:
+
+    python tests/harness.py [--latency 0.001]
+"""
+
+import argparse
+import importlib
+import os
+import sys
+import time
+import types
+
+TESTS = os.path.dirname(os.path.realpath(__file__))
+ROOT = os.path.dirname(TESTS)
+if TESTS not in sys.path:
+    sys.path.insert(0, TESTS)
+
+import sublime_api
+
+
+def load_plugin():
+    """Imports sublime_term.py as the module of the "Term" package"""
+    if "Term" not in sys.modules:
+        package = types.ModuleType("Term")
+        package.__path__ = [ROOT]
+        sys.modules["Term"] = package
+    return importlib.import_module("Term.sublime_term")
+
+
+class Harness:
+    """Headless terminal session
+
+    Arguments:
+        command {list} -- command of the process
+
+    Keyword Arguments:
+        latency {number} -- Duration of every fake API call in seconds (default: {0})
+        env {dict} -- Environment of the process (default: {None})
+        settings {dict} -- Term settings (default: {None})
+    """
+
+    def __init__(self, command, latency=0., env=None, settings=None):
+        self.command = command
+        self.latency = latency
+        self.env = env
+        self.settings_values = settings or {}
+
+        self.plugin = load_plugin()
+        self.sublimeterm = self.plugin.sublimeterm
+        self.view_controller = None
+        self.process_controller = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def start(self):
+        import sublime
+
+        sublime_api.reset()
+        sublime_api.text_commands["term_editor"] = self.plugin.TermEditorCommand
+        sublime_api.event_listeners.append(self.plugin.TermListener())
+        sublime_api.set_latency(self.latency)
+
+        settings = sublime.load_settings("Term.sublime-settings")
+        for (key, value) in self.settings_values.items():
+            settings.set(key, value)
+
+        input_transcoder = self.sublimeterm.InputTranscoder()
+        output_transcoder = self.sublimeterm.ANSIOutputTranscoder()
+        self.view_controller = self.sublimeterm.SublimetermViewController(input_transcoder, output_transcoder,
+                                                                          settings=settings)
+        self.process_controller = self.sublimeterm.ProcessController(input_transcoder, output_transcoder,
+                                                                     command=self.command, env=self.env)
+        self.view_controller.start()
+        self.process_controller.start()
+
+    def close(self):
+        if self.process_controller is not None:
+            self.process_controller.close()
+        if self.view_controller is not None:
+            self.view_controller.close()
+        # The fake API is reset by the next session, its threads must be done
+        for controller in (self.process_controller, self.view_controller):
+            for name in ("read_thread", "parse_thread", "write_thread", "wait_thread", "editing_thread",
+                         "listening_thread"):
+                thread = getattr(controller, name, None)
+                if thread is not None:
+                    thread.join(timeout=5)
+
+    @property
+    def view_id(self):
+        return self.view_controller.console.view_id
+
+    def text(self):
+        """Returns the content of the fake view"""
+        with sublime_api.main_lock:
+            return sublime_api.views[self.view_id].text
+
+    def type(self, text):
+        """Types `text` in the view, one key at a time"""
+        for char in text:
+            sublime_api.user_type(self.view_id, char)
+
+    def press(self, key):
+        """Presses a key bound to the term command ("enter", "up", "tab", "interrupt"...)"""
+        import sublime
+        self.plugin.TermCommand(sublime.active_window()).run(key=key)
+
+    def wait_for_text(self, expected, timeout=5.):
+        """Waits until the view contains `expected`
+
+        Returns:
+            bool -- False if the view still does not contain it after `timeout`
+        """
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if expected in self.text():
+                return True
+            time.sleep(0.005)
+        return expected in self.text()
+
+
+def measure(latency=0., size=20000, keystrokes=20):
+    """Measures the headless pipeline
+
+    Returns:
+        dict -- output throughput in kB/s and keystroke echo latencies in ms
+    """
+    results = {}
+
+    marker = "END-OF-OUTPUT"
+    command = ["/bin/sh", "-c", "head -c {} /dev/zero | tr '\\0' 'x' | fold -w 79; echo; echo {}".format(size, marker)]
+    with Harness(command, latency=latency) as harness:
+        start = time.time()
+        harness.wait_for_text(marker + "\n", timeout=120)
+        results["throughput_kb_per_s"] = round(size / (time.time() - start) / 1000, 3)
+
+    latencies = []
+    with Harness(["cat"], latency=latency) as harness:
+        time.sleep(0.5)
+        typed = ""
+        for i in range(keystrokes):
+            char = "abcdefghijklmnopqrstuvwxyz"[i % 26]
+            typed += char
+            start = time.time()
+            harness.type(char)
+            # The echo of cat replaces the typed character
+            harness.wait_for_text(typed, timeout=5)
+            while harness.view_controller.is_content_dirty and time.time() - start < 5:
+                time.sleep(0.0005)
+            latencies.append((time.time() - start) * 1000)
+    latencies.sort()
+    results["echo_latency_ms"] = {
+        "p50": round(latencies[len(latencies) // 2], 3),
+        "max": round(latencies[-1], 3),
+    }
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Headless pipeline measurement")
+    parser.add_argument("--latency", type=float, default=0., help="duration of every fake API call, in seconds")
+    parser.add_argument("--size", type=int, default=20000, help="characters of output for the throughput")
+    options = parser.parse_args()
+    print(measure(latency=options.latency, size=options.size))
@@ -1 +1,429 @@
-print("Not in a Sublime Text environment")
\ No newline at end of file
+# Copyright (C) 2016-2017 Perceval Wajsburt <perceval.wajsburt@gmail.com>
+#
+# This module is part of SublimeTerm and is released under
+# the MIT License: http://www.opensource.org/licenses/mit-license.php
+
+"""
+In-memory fake of the Sublime Text API
+
+Implements the part of `sublime_api` that `sublime.py` calls on behalf of
+the plugin (windows, views, selections, edits, settings, viewport), so
+that the SublimetermViewController can run headless.
+
+Like in Sublime Text, the API calls and the event listeners all run on
+a single "main thread", emulated here by `main_lock`. Every call can be
+slowed down with `set_latency` to reproduce a busy editor.
+"""
+
+import sys
+import time
+from threading import RLock
+
+main_lock = RLock()
+
+# Text commands that `view_run_command` can run, by name (TextCommand classes)
+text_commands = {}
+# EventListener instances notified of the view modifications
+event_listeners = []
+
+latencies = {}
+
+EM_WIDTH = 8.
+LINE_HEIGHT = 16.
+
+windows = {}
+views = {}
+settings = {}
+last_id = [0]
+
+
+def next_id():
+    last_id[0] += 1
+    return last_id[0]
+
+
+class FakeView:
+    def __init__(self, window_id, name=""):
+        self.window_id = window_id
+        self.name = name
+        self.text = ""
+        # Selection as a list of (a, b)
+        self.selection = [(0, 0)]
+        self.settings_id = new_settings()
+        self.scratch = False
+        self.read_only = False
+        self.viewport_position = (0., 0.)
+        self.viewport_extent = (83 * EM_WIDTH, 25 * LINE_HEIGHT)
+        self.modified = False
+        self.selection_modified = False
+        self.edit_depth = 0
+
+    def shift(self, begin, end, length):
+        """Updates the selection after the region [begin, end) has been replaced by `length` chars"""
+        delta = length - (end - begin)
+
+        def shifted(p):
+            if p >= end:
+                return p + delta
+            if p > begin:
+                return min(p, begin + length)
+            return p
+        selection = [(shifted(a), shifted(b)) for (a, b) in self.selection]
+        if selection != self.selection:
+            self.selection = selection
+            self.selection_modified = True
+
+    def replace(self, begin, end, text):
+        begin = max(0, min(begin, len(self.text)))
+        end = max(begin, min(end, len(self.text)))
+        self.text = self.text[:begin] + text + self.text[end:]
+        self.shift(begin, end, len(text))
+        if end > begin or text:
+            self.modified = True
+
+
+class FakeWindow:
+    def __init__(self):
+        self.views = {}
+        self.panels = {}
+        self.active_view = None
+        self.settings_id = new_settings()
+
+
+def set_latency(seconds, name=None):
+    """Makes every API call (or only the call `name`) last at least `seconds`"""
+    latencies[name] = seconds
+
+
+def reset():
+    """Forgets every window, view, setting, command, listener and latency"""
+    with main_lock:
+        windows.clear()
+        views.clear()
+        settings.clear()
+        text_commands.clear()
+        del event_listeners[:]
+        latencies.clear()
+
+
+def call(name):
+    latency = latencies.get(name, latencies.get(None, 0))
+    if latency:
+        time.sleep(latency)
+
+
+def notify(view_id):
+    """Calls the listeners of the modifications of the view, like the main loop does"""
+    view = views[view_id]
+    modified, view.modified = view.modified, False
+    selection_modified, view.selection_modified = view.selection_modified, False
+    if not (modified or selection_modified):
+        return
+    import sublime
+    for listener in list(event_listeners):
+        if modified and hasattr(listener, "on_modified"):
+            listener.on_modified(sublime.View(view_id))
+        if hasattr(listener, "on_selection_modified"):
+            listener.on_selection_modified(sublime.View(view_id))
+
+
+##############
+# Application
+##############
+
+def version():
+    return "3126"
+
+
+def log_message(s):
+    sys.__stdout__.write(s)
+
+
+def status_message(msg):
+    pass
+
+
+def packages_path():
+    return ""
+
+
+def active_window():
+    with main_lock:
+        if not windows:
+            windows[next_id()] = FakeWindow()
+        return min(windows)
+
+
+###########
+# Settings
+###########
+
+def new_settings():
+    settings_id = next_id()
+    settings[settings_id] = {}
+    return settings_id
+
+
+def load_settings(base_name):
+    with main_lock:
+        for (settings_id, values) in settings.items():
+            if values.get("__name__") == base_name:
+                return settings_id
+        settings_id = new_settings()
+        settings[settings_id]["__name__"] = base_name
+        return settings_id
+
+
+def settings_get(settings_id, key):
+    return settings[settings_id].get(key)
+
+
+def settings_get_default(settings_id, key, default):
+    return settings[settings_id].get(key, default)
+
+
+def settings_has(settings_id, key):
+    return key in settings[settings_id]
+
+
+def settings_set(settings_id, key, value):
+    settings[settings_id][key] = value
+
+
+def settings_erase(settings_id, key):
+    settings[settings_id].pop(key, None)
+
+
+##########
+# Windows
+##########
+
+def window_open_file(window_id, fname, flags, group):
+    with main_lock:
+        call("window_open_file")
+        window = windows[window_id]
+        view_id = next_id()
+        views[view_id] = FakeView(window_id, fname)
+        window.views[view_id] = views[view_id]
+        window.active_view = view_id
+        return view_id
+
+
+def window_new_file(window_id, flags, syntax):
+    return window_open_file(window_id, "", flags, -1)
+
+
+def window_create_output_panel(window_id, name, unlisted):
+    with main_lock:
+        call("window_create_output_panel")
+        window = windows[window_id]
+        view_id = next_id()
+        views[view_id] = FakeView(window_id, name)
+        window.panels[name] = view_id
+        return view_id
+
+
+def window_find_output_panel(window_id, name):
+    return windows[window_id].panels.get(name, 0)
+
+
+def window_focus_view(window_id, view_id):
+    windows[window_id].active_view = view_id
+
+
+def window_run_command(window_id, cmd, args):
+    pass
+
+
+def window_settings(window_id):
+    return windows[window_id].settings_id
+
+
+########
+# Views
+########
+
+def view_window(view_id):
+    return views[view_id].window_id if view_id in views else 0
+
+
+def view_buffer_id(view_id):
+    return view_id if view_id in views else 0
+
+
+def view_set_scratch(view_id, scratch):
+    views[view_id].scratch = scratch
+
+
+def view_set_read_only(view_id, read_only):
+    views[view_id].read_only = read_only
+
+
+def view_settings(view_id):
+    return views[view_id].settings_id
+
+
+def view_assign_syntax(view_id, syntax_file):
+    pass
+
+
+def view_size(view_id):
+    with main_lock:
+        call("view_size")
+        return len(views[view_id].text)
+
+
+def view_cached_substr(view_id, a, b):
+    with main_lock:
+        call("view_cached_substr")
+        (a, b) = (min(a, b), max(a, b))
+        return views[view_id].text[max(0, a):max(0, b)]
+
+
+def view_selection_size(view_id):
+    with main_lock:
+        call("view_selection_size")
+        return len(views[view_id].selection)
+
+
+def view_selection_get(view_id, index):
+    import sublime
+    with main_lock:
+        call("view_selection_get")
+        selection = views[view_id].selection
+        if index >= len(selection):
+            return sublime.Region(-1, -1)
+        return sublime.Region(*selection[index])
+
+
+def view_selection_clear(view_id):
+    with main_lock:
+        call("view_selection_clear")
+        views[view_id].selection = []
+
+
+def view_selection_add_region(view_id, a, b, xpos):
+    with main_lock:
+        call("view_selection_add_region")
+        view = views[view_id]
+        if (a, b) not in view.selection:
+            view.selection.append((a, b))
+            view.selection.sort()
+
+
+def view_selection_add_point(view_id, pt):
+    view_selection_add_region(view_id, pt, pt, -1)
+
+
+def view_run_command(view_id, cmd, args):
+    """Runs a registered text command, then notifies the listeners"""
+    import sublime
+    with main_lock:
+        call("view_run_command")
+        command_class = text_commands.get(cmd)
+        if command_class is None:
+            return
+        command_class(sublime.View(view_id)).run_(next_id(), args)
+        notify(view_id)
+
+
+def view_begin_edit(view_id, edit_token, cmd, args=None):
+    views[view_id].edit_depth += 1
+
+
+def view_end_edit(view_id, edit_token):
+    views[view_id].edit_depth -= 1
+
+
+def view_insert(view_id, edit_token, pt, text):
+    with main_lock:
+        call("view_insert")
+        views[view_id].replace(pt, pt, text)
+        return len(text)
+
+
+def view_erase(view_id, edit_token, r):
+    with main_lock:
+        call("view_erase")
+        views[view_id].replace(r.begin(), r.end(), "")
+
+
+def view_replace(view_id, edit_token, r, text):
+    with main_lock:
+        call("view_replace")
+        views[view_id].replace(r.begin(), r.end(), text)
+
+
+def view_viewport_position(view_id):
+    return views[view_id].viewport_position
+
+
+def view_set_viewport_position(view_id, xy, animate):
+    with main_lock:
+        call("view_set_viewport_position")
+        views[view_id].viewport_position = tuple(xy)
+
+
+def view_viewport_extents(view_id):
+    with main_lock:
+        call("view_viewport_extents")
+        return views[view_id].viewport_extent
+
+
+def view_text_to_layout(view_id, tp):
+    with main_lock:
+        call("view_text_to_layout")
+        text = views[view_id].text[:tp]
+        row = text.count('\n')
+        column = len(text) - (text.rfind('\n') + 1)
+        return (column * EM_WIDTH, row * LINE_HEIGHT)
+
+
+def view_line_height(view_id):
+    return LINE_HEIGHT
+
+
+def view_em_width(view_id):
+    return EM_WIDTH
+
+
+##############
+# User inputs
+##############
+
+def user_type(view_id, text):
+    """Types `text` at the caret, as the user would"""
+    with main_lock:
+        view = views[view_id]
+        (a, b) = view.selection[0] if view.selection else (0, 0)
+        view.replace(min(a, b), max(a, b), text)
+        view.selection = [(min(a, b) + len(text),) * 2]
+        view.selection_modified = True
+        notify(view_id)
+
+
+def user_backspace(view_id, count=1):
+    """Erases `count` characters before the caret, as the user would"""
+    with main_lock:
+        view = views[view_id]
+        (a, b) = view.selection[0] if view.selection else (0, 0)
+        begin = max(0, min(a, b) - count)
+        view.replace(begin, min(a, b), "")
+        view.selection = [(begin, begin)]
+        view.selection_modified = True
+        notify(view_id)
+
+
+def user_move(view_id, pt):
+    """Moves the caret, as the user would"""
+    with main_lock:
+        view = views[view_id]
+        view.selection = [(pt, pt)]
+        view.selection_modified = True
+        notify(view_id)
+
+
+def user_resize(view_id, cols, rows):
+    """Resizes the viewport to `cols` x `rows` characters, as the user would"""
+    with main_lock:
+        views[view_id].viewport_extent = ((cols + 3) * EM_WIDTH, (rows + 1) * LINE_HEIGHT)
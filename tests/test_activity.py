@@ -0,0 +1,48 @@
+# Copyright (C) 2016-2017 Perceval Wajsburt <perceval.wajsburt@gmail.com>
+#
+# This module is part of SublimeTerm and is released under
+# the MIT License: http://www.opensource.org/licenses/mit-license.php
+
+from unittest import TestCase
+from threading import Timer
+from sublimeterm.activity import Activity
+from sublimeterm.ansi_output_transcoder import ANSIOutputTranscoder
+import re
+import time
+
+
+class TestActivity(TestCase):
+    def test_wait_idle(self):
+        activity = Activity()
+        self.assertTrue(activity.wait_idle(quiet_ms=10, timeout=1))
+
+        # Events keep the stream busy
+        timers = [Timer(0.02 * i, activity.notify) for i in range(10)]
+        for timer in timers:
+            timer.start()
+        self.assertFalse(activity.wait_idle(quiet_ms=100, timeout=0.1))
+        start = time.time()
+        self.assertTrue(activity.wait_idle(quiet_ms=50, timeout=2))
+        self.assertGreaterEqual(time.time() - start, 0.05)
+
+    def test_wait_for(self):
+        activity = Activity()
+        text = ["loading"]
+        Timer(0.05, lambda: text.append(" done") or activity.notify()).start()
+        match = activity.wait_for(lambda: ''.join(text), re.compile("(d.ne)"), timeout=2)
+        self.assertEqual("done", match.group(1))
+        self.assertIsNone(activity.wait_for(lambda: ''.join(text), "never", timeout=0.05))
+
+    def test_closed(self):
+        activity = Activity()
+        Timer(0.05, activity.close).start()
+        start = time.time()
+        self.assertIsNone(activity.wait_for(lambda: "", "never"))
+        self.assertTrue(activity.wait_idle(quiet_ms=10000))
+        self.assertLess(time.time() - start, 1)
+
+    def test_output_transcoder(self):
+        sm = ANSIOutputTranscoder()
+        Timer(0.05, sm.decode, ["\x1b[1mprompt$ "]).start()
+        self.assertEqual(True, sm.wait_for(lambda content: content.endswith("$ "), timeout=2))
+        self.assertEqual(1, sm.activity.count)
@@ -15,3 +15,11 @@ class TestANSIOutputTranscoder(TestCase):
 
         expected_output1 = ('AAAAAA\nAAAok\nAAAAAA\n', 0, 20, 20, 20, 20)
         self.assertEqual(expected_output1, sm.pop_output(timeout=1))
+
+    def test_bracketed_paste_mode(self):
+        sm = ANSIOutputTranscoder()
+
+        sm.decode("\x1b[?2004h$ ")
+        self.assertTrue(sm.bracketed_paste)
+        sm.decode("\x1b[?2004l")
+        self.assertFalse(sm.bracketed_paste)
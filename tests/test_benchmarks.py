@@ -0,0 +1,27 @@
+# Copyright (C) 2016-2017 Perceval Wajsburt <perceval.wajsburt@gmail.com>
+#
+# This module is part of SublimeTerm and is released under
+# the MIT License: http://www.opensource.org/licenses/mit-license.php
+
+from unittest import TestCase
+from benchmarks.corpora import CORPORA, build_corpus
+from benchmarks.run import compare, run_benchmarks
+
+
+class TestBenchmarks(TestCase):
+    def test_corpora(self):
+        for name in CORPORA:
+            corpus = build_corpus(name, 1000)
+            self.assertTrue(len(corpus) >= 1000, name)
+            self.assertEqual(corpus, build_corpus(name, 1000))
+
+    def test_run_and_compare(self):
+        results = run_benchmarks(size=256, repeat=1, only="plain_text")
+        self.assertEqual(["decode/plain_text", "fsm/plain_text"], sorted(results))
+        self.assertTrue(results["decode/plain_text"]["mb_per_s"] > 0)
+
+        baseline = {name: dict(r, ns_per_unit=r["ns_per_unit"] / 2) for (name, r) in results.items()}
+        rows = compare(results, baseline, tolerance=10)
+        self.assertEqual([True, True], [regression for (name, before, after, change, regression) in rows])
+        rows = compare(results, results, tolerance=10)
+        self.assertEqual([False, False], [regression for (name, before, after, change, regression) in rows])
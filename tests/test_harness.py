@@ -0,0 +1,26 @@
+# Copyright (C) 2016-2017 Perceval Wajsburt <perceval.wajsburt@gmail.com>
+#
+# This module is part of SublimeTerm and is released under
+# the MIT License: http://www.opensource.org/licenses/mit-license.php
+
+from unittest import TestCase
+from harness import Harness
+
+
+class TestHarness(TestCase):
+    def test_echo(self):
+        with Harness(["/bin/sh", "-c", "echo hello"]) as harness:
+            self.assertTrue(harness.wait_for_text("hello\n"))
+
+    def test_typed_input(self):
+        with Harness(["cat"], latency=0.001) as harness:
+            harness.type("abc")
+            harness.press("enter")
+            self.assertTrue(harness.wait_for_text("abc\nabc\n"))
+
+    def test_output_after_exit(self):
+        # More than one read of the PTY, written just before the process exits
+        command = ["/bin/sh", "-c", "head -c 6000 /dev/zero | tr '\\0' 'x' | fold -w 79; echo; echo END"]
+        with Harness(command) as harness:
+            self.assertTrue(harness.wait_for_text("END\n", timeout=30))
+            self.assertEqual(6000, harness.text().count("x"))
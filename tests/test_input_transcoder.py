@@ -0,0 +1,39 @@
+# Copyright (C) 2016-2017 Perceval Wajsburt <perceval.wajsburt@gmail.com>
+#
+# This module is part of SublimeTerm and is released under
+# the MIT License: http://www.opensource.org/licenses/mit-license.php
+
+from unittest import TestCase
+from sublimeterm.input_transcoder import InputTranscoder
+from sublimeterm.utils import SpecialChar
+
+
+class TestInputTranscoder(TestCase):
+    def test_folded_moves(self):
+        it = InputTranscoder()
+
+        it.write("ls")
+        it.move(-30)
+        it.move(10)
+        it.move(-2)
+        it.erase(1)
+        it.erase(2)
+        it.move(3)
+        it.move(-3)
+        it.write("a")
+
+        expected_inputs = [(0, "ls"), (0, SpecialChar.LEFT * 22), (0, SpecialChar.DEL * 3), (0, "a")]
+        self.assertEqual(expected_inputs, it.pop_inputs())
+
+    def test_numeric_argument(self):
+        it = InputTranscoder(numeric_argument=True)
+
+        it.move(1)
+        it.write("x")
+        it.move(-120)
+        it.erase(5)
+
+        self.assertEqual((0, SpecialChar.RIGHT), it.pop_input(timeout=1))
+        self.assertEqual((0, "x"), it.pop_input(timeout=1))
+        self.assertEqual((0, "\x1b120" + SpecialChar.LEFT), it.pop_input(timeout=1))
+        self.assertEqual([(0, "\x1b5" + SpecialChar.DEL)], it.pop_inputs())
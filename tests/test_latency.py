@@ -0,0 +1,75 @@
+# Copyright (C) 2016-2017 Perceval Wajsburt <perceval.wajsburt@gmail.com>
+#
+# This module is part of SublimeTerm and is released under
+# the MIT License: http://www.opensource.org/licenses/mit-license.php
+
+from unittest import TestCase
+from sublimeterm.latency import Histogram, LatencyTracer, Stage, trace, trace_keystroke
+from sublimeterm.input_transcoder import InputTranscoder
+import json
+import os
+import tempfile
+import time
+
+
+class TestLatency(TestCase):
+    def tearDown(self):
+        LatencyTracer.disable()
+
+    def test_histogram(self):
+        histogram = Histogram()
+        for i in range(1, 101):
+            histogram.add(i / 1000.)
+
+        # Percentiles are the upper bound of their bucket, 2^(1/4) wide at most
+        self.assertTrue(0.050 <= histogram.percentile(50) < 0.050 * 1.2)
+        self.assertTrue(0.095 <= histogram.percentile(95) < 0.095 * 1.2)
+        self.assertEqual(0.1, histogram.percentile(100))
+        self.assertEqual(100, histogram.summary()["count"])
+        self.assertEqual(0., Histogram().percentile(99))
+
+    def test_stages(self):
+        # Disabled tracing does nothing
+        trace_keystroke()
+        trace(Stage.ENQUEUE)
+
+        tracer = LatencyTracer.enable()
+        input_transcoder = InputTranscoder()
+
+        trace_keystroke()
+        input_transcoder.write("a")
+        trace(Stage.WRITE)
+        # Output without a pending keystroke at the previous stage
+        trace_keystroke()
+        trace(Stage.READ)
+        time.sleep(0.01)
+        trace(Stage.FLUSH)
+        trace(Stage.EDIT)
+
+        summary = tracer.summary()
+        self.assertEqual(1, summary["edit"]["count"])
+        self.assertEqual(1, summary["read"]["count"])
+        self.assertTrue(summary["edit"]["max"] >= 10)
+        self.assertTrue(summary["read"]["max"] < summary["edit"]["max"])
+        # The second keystroke is still waiting for its echo
+        self.assertEqual(1, len(tracer.pending))
+
+        path = os.path.join(tempfile.mkdtemp(), "latency.json")
+        tracer.dump(path)
+        with open(path) as f:
+            dumped = json.load(f)
+        self.assertEqual(summary, dumped["summary"])
+        self.assertEqual(1, sum(dumped["histograms"]["edit"]["counts"]))
+
+        tracer.reset()
+        self.assertEqual(0, tracer.summary()["edit"]["count"])
+
+    def test_expiry(self):
+        tracer = LatencyTracer.enable(max_pending=2, expiry=0.01)
+        trace_keystroke()
+        trace_keystroke()
+        trace_keystroke()
+        self.assertEqual(2, len(tracer.pending))
+        time.sleep(0.02)
+        trace_keystroke()
+        self.assertEqual(1, len(tracer.pending))
@@ -8,6 +8,9 @@ from sublimeterm.process_controller import ProcessController
 
 from sublimeterm.ansi_output_transcoder import *
 from sublimeterm.input_transcoder import *
+from sublimeterm.utils import SpecialChar
+import os
+import signal
 import time
 
 
@@ -15,16 +18,16 @@ class TestProcessController(TestCase):
     def test_no_input(self):
         input_transcoder = InputTranscoder()
         output_transcoder = ANSIOutputTranscoder()
-        with ProcessController(input_transcoder, output_transcoder, command=["echo", 'Hello World']):
-            time.sleep(3)
+        with ProcessController(input_transcoder, output_transcoder, command=["echo", 'Hello World']) as controller:
+            self.assertTrue(controller.wait_idle(timeout=5))
             expected_result = ('Hello World\n', 0, 12, 12, 12, 12)
             self.assertEqual(expected_result, output_transcoder.pop_output(timeout=2))
 
     def test_dumb_input(self):
         input_transcoder = InputTranscoder()
         output_transcoder = ANSIOutputTranscoder()
-        with ProcessController(input_transcoder, output_transcoder, command=["echo", 'Hello World']):
-            time.sleep(3)
+        with ProcessController(input_transcoder, output_transcoder, command=["echo", 'Hello World']) as controller:
+            self.assertTrue(controller.wait_idle(timeout=5))
             input_transcoder.write("DUMB INPUT")
             expected_result = ('Hello World\n', 0, 12, 12, 12, 12)
             self.assertEqual(expected_result, output_transcoder.pop_output(timeout=2))
@@ -32,9 +35,89 @@ class TestProcessController(TestCase):
     def test_sh(self):
         input_transcoder = InputTranscoder()
         output_transcoder = ANSIOutputTranscoder()
-        with ProcessController(input_transcoder, output_transcoder, command=["/bin/sh"], env={"PS1": "BASH$"}):
-            time.sleep(3)
-            self.assertRegexpMatches(output_transcoder.pop_output(timeout=2)[0], "BASH\$")
+        with ProcessController(input_transcoder, output_transcoder, command=["/bin/sh"],
+                               env={"PS1": "BASH$"}) as controller:
+            self.assertIsNotNone(controller.wait_for("BASH\\$", timeout=5))
+            self.assertRegexpMatches(output_transcoder.pop_output(timeout=2)[0], "BASH\\$")
             input_transcoder.write("pwd\n")
-            time.sleep(2)
-            self.assertIn("/", output_transcoder.pop_output(timeout=2)[0])
\ No newline at end of file
+            self.assertIsNotNone(controller.wait_for("pwd\n/.*\nBASH\\$", timeout=5))
+            self.assertIn("/", output_transcoder.pop_output(timeout=2)[0])
+
+    def test_wait_for_exit(self):
+        input_transcoder = InputTranscoder()
+        output_transcoder = ANSIOutputTranscoder()
+        with ProcessController(input_transcoder, output_transcoder, command=["echo", 'Hello World']) as controller:
+            match = controller.wait_for("W(or)ld", timeout=5)
+            self.assertEqual("or", match.group(1))
+            # The process exited without showing it, no need to wait for the timeout
+            start = time.time()
+            self.assertIsNone(controller.wait_for(lambda content: "Goodbye" in content, timeout=30))
+            self.assertTrue(controller.wait_idle(quiet_ms=10000, timeout=30))
+            self.assertLess(time.time() - start, 5)
+
+    def test_coalesced_inputs(self):
+        input_transcoder = InputTranscoder()
+        output_transcoder = ANSIOutputTranscoder()
+        controller = ProcessController(input_transcoder, output_transcoder)
+        controller.spawn(["cat"], None, None)
+        try:
+            for char in "hello":
+                input_transcoder.write(char)
+            input_transcoder.set_size(80, 24, 1, 12)
+            input_transcoder.write("\n")
+
+            written = []
+            controller.write_pending = lambda: written.append(bytes(controller.write_buffer)) or \
+                ProcessController.write_pending(controller)
+            self.assertFalse(controller.flush_inputs())
+            # The resize went through the priority lane, the text is written at once
+            self.assertEqual([b"hello\n"], written)
+        finally:
+            controller.close()
+
+    def test_interrupt(self):
+        input_transcoder = InputTranscoder()
+        output_transcoder = ANSIOutputTranscoder()
+        controller = ProcessController(input_transcoder, output_transcoder)
+        controller.spawn(["cat"], None, None)
+        try:
+            # Fill the tty input buffer: nobody reads it while cat is stopped
+            os.kill(controller.process.pid, signal.SIGSTOP)
+            input_transcoder.write("x" * 1000000)
+            self.assertTrue(controller.flush_inputs())
+
+            input_transcoder.write("more text")
+            input_transcoder.write(SpecialChar.INTERRUPT)
+            # The text not sent yet has been discarded
+            self.assertFalse(controller.flush_inputs())
+            self.assertEqual(0, len(controller.write_buffer))
+        finally:
+            os.kill(controller.process.pid, signal.SIGCONT)
+            controller.close()
+
+    def test_chunked_paste(self):
+        input_transcoder = InputTranscoder()
+        output_transcoder = ANSIOutputTranscoder()
+        controller = ProcessController(input_transcoder, output_transcoder, paste_chunk_size=16)
+        controller.spawn(["cat"], None, None)
+        try:
+            os.kill(controller.process.pid, signal.SIGSTOP)
+            input_transcoder.paste("line 1\nline 2\nline 3\n", bracketed=True)
+            input_transcoder.write("typed")
+
+            written = []
+            controller.write_pending = lambda: written.append(bytes(controller.write_buffer)) or \
+                ProcessController.write_pending(controller)
+            self.assertTrue(controller.flush_inputs())
+            # The first chunk waits for cat to read it
+            self.assertTrue(controller.paste_throttled)
+            self.assertEqual([b"\x1b[200~line 1\n"], written)
+
+            os.kill(controller.process.pid, signal.SIGCONT)
+            deadline = time.time() + 5
+            while controller.flush_inputs() and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertEqual([b"\x1b[200~line 1\n", b"line 2\nline 3\n", b"\x1b[201~typed"], written)
+        finally:
+            os.kill(controller.process.pid, signal.SIGCONT)
+            controller.close()
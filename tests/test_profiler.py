@@ -0,0 +1,57 @@
+# Copyright (C) 2016-2017 Perceval Wajsburt <perceval.wajsburt@gmail.com>
+#
+# This module is part of SublimeTerm and is released under
+# the MIT License: http://www.opensource.org/licenses/mit-license.php
+
+from unittest import TestCase
+from sublimeterm.ansi_output_transcoder import ANSIOutputTranscoder
+from sublimeterm.profiler import Profiler, profile
+from threading import Thread
+import json
+import os
+import tempfile
+
+
+class TestProfiler(TestCase):
+    def tearDown(self):
+        Profiler.stop()
+
+    def test_toggle(self):
+        output_transcoder = ANSIOutputTranscoder()
+        output_transcoder.decode("not profiled")
+        self.assertIsNone(Profiler.stop())
+
+        profiler = Profiler.start()
+        output_transcoder.decode("profiled\n")
+        output_transcoder.pop_output()
+        self.assertIs(profiler, Profiler.stop())
+
+        output_transcoder.decode("not profiled")
+        names = [event["name"] for event in profiler.trace_events() if event["ph"] == "X"]
+        self.assertEqual(["end_sequence", "decode", "pop_output"], names)
+
+    def test_chrome_trace(self):
+        profiler = Profiler.start(max_events=2)
+
+        def record():
+            for i in range(3):
+                with profile("span"):
+                    pass
+        thread = Thread(target=record, name="recorder")
+        thread.start()
+        thread.join()
+        with profile("main"):
+            pass
+
+        path = os.path.join(tempfile.mkdtemp(), "trace.json")
+        profiler.dump(path)
+        with open(path) as f:
+            events = json.load(f)["traceEvents"]
+
+        threads = {event["tid"]: event["args"]["name"] for event in events if event["ph"] == "M"}
+        self.assertIn("recorder", threads.values())
+        spans = [event for event in events if event["ph"] == "X"]
+        # The oldest span of the recorder thread has been dropped
+        self.assertEqual(2, len([span for span in spans if threads[span["tid"]] == "recorder"]))
+        self.assertEqual(1, len([span for span in spans if span["name"] == "main"]))
+        self.assertTrue(all(span["dur"] >= 0 and span["ts"] >= 0 for span in spans))
@@ -0,0 +1,84 @@
+# Copyright (C) 2016-2017 Perceval Wajsburt <perceval.wajsburt@gmail.com>
+#
+# This module is part of SublimeTerm and is released under
+# the MIT License: http://www.opensource.org/licenses/mit-license.php
+
+from unittest import TestCase
+from sublimeterm.reactor import Reactor
+from sublimeterm.process_controller import ProcessController
+
+from sublimeterm.ansi_output_transcoder import *
+from sublimeterm.input_transcoder import *
+from threading import Event, Lock
+import os
+import time
+
+
+class PipeSession:
+    def __init__(self, name, log, lock):
+        self.name = name
+        self.log = log
+        self.lock = lock
+        self.read_fd, self.write_fd = os.pipe()
+        self.pending = 0
+        self.closed = Event()
+
+    def fileno(self):
+        return self.read_fd
+
+    def on_readable(self):
+        data = os.read(self.read_fd, 65536)
+        if not data:
+            return False
+        with self.lock:
+            self.pending += len(data)
+        return True
+
+    def process_pending(self, budget):
+        time.sleep(0.001)
+        with self.lock:
+            done = min(budget, self.pending)
+            self.pending -= done
+            if done:
+                self.log.append(self.name)
+            return self.pending > 0
+
+    def on_closed(self):
+        self.closed.set()
+
+
+class TestReactor(TestCase):
+    def test_fair_scheduling(self):
+        log = []
+        lock = Lock()
+        flood = PipeSession("flood", log, lock)
+        echo = PipeSession("echo", log, lock)
+        with Reactor(workers=1, budget=16) as reactor:
+            reactor.register(flood)
+            reactor.register(echo)
+            time.sleep(0.1)
+            with lock:
+                # Simulate a big burst already read but not parsed yet
+                flood.pending = 16 * 1000
+            reactor.schedule(flood)
+            os.write(echo.write_fd, b"a")
+            deadline = time.time() + 5
+            while "echo" not in log and time.time() < deadline:
+                time.sleep(0.01)
+            with lock:
+                self.assertIn("echo", log)
+                # The echo session did not wait for the whole flood
+                self.assertGreater(flood.pending, 0)
+            os.close(echo.write_fd)
+            self.assertTrue(echo.closed.wait(timeout=5))
+        os.close(flood.write_fd)
+
+    def test_process_controller(self):
+        input_transcoder = InputTranscoder()
+        output_transcoder = ANSIOutputTranscoder()
+        with Reactor() as reactor:
+            with ProcessController(input_transcoder, output_transcoder, command=["echo", 'Hello World'],
+                                   reactor=reactor):
+                time.sleep(1)
+                expected_result = ('Hello World\n', 0, 12, 12, 12, 12)
+                self.assertEqual(expected_result, output_transcoder.pop_output(timeout=2))
@@ -0,0 +1,55 @@
+# Copyright (C) 2016-2017 Perceval Wajsburt <perceval.wajsburt@gmail.com>
+#
+# This module is part of SublimeTerm and is released under
+# the MIT License: http://www.opensource.org/licenses/mit-license.php
+
+from unittest import TestCase
+from sublimeterm.ansi_output_transcoder import ANSIOutputTranscoder
+from sublimeterm.input_transcoder import InputTranscoder
+from sublimeterm.process_controller import ProcessController
+from sublimeterm.recording import SessionRecorder, read_recording, replay, INPUT, OUTPUT, SIZE
+import os
+import struct
+import tempfile
+
+
+class TestRecording(TestCase):
+    def test_record_session(self):
+        path = os.path.join(tempfile.mkdtemp(), "session.strec")
+        input_transcoder = InputTranscoder()
+        output_transcoder = ANSIOutputTranscoder()
+        with ProcessController(input_transcoder, output_transcoder, command=["cat"], record_path=path) as controller:
+            input_transcoder.set_size(80, 24, 1, 12)
+            input_transcoder.write("héllo\n")
+            controller.wait_for("héllo\nhéllo\n", timeout=5)
+
+        records = list(read_recording(path))
+        kinds = [kind for (kind, timestamp, payload) in records]
+        self.assertIn(SIZE, kinds)
+        self.assertEqual("héllo\n".encode('UTF-8'),
+                         b"".join(payload for (kind, timestamp, payload) in records if kind == INPUT))
+        timestamps = [timestamp for (kind, timestamp, payload) in records]
+        self.assertEqual(sorted(timestamps), timestamps)
+
+        replayed = ANSIOutputTranscoder()
+        stats = replay(path, replayed)
+        self.assertEqual(kinds.count(OUTPUT), stats["records"])
+        self.assertEqual(output_transcoder.get_between(0, output_transcoder.content_size),
+                         replayed.get_between(0, replayed.content_size))
+
+    def test_truncated_recording(self):
+        path = os.path.join(tempfile.mkdtemp(), "session.strec")
+        with SessionRecorder(path) as recorder:
+            recorder.record_size(struct.pack('HHHH', 24, 80, 12, 1))
+            recorder.record_output("café".encode('UTF-8')[:4])
+            recorder.record_output("café".encode('UTF-8')[4:])
+            recorder.record_output(b"\r\nnext")
+        with open(path, 'ab') as f:
+            f.write(b"\0\0")
+
+        output_transcoder = ANSIOutputTranscoder()
+        stats = replay(path, output_transcoder, realtime=True)
+        self.assertEqual(3, stats["records"])
+        # The split character has been decoded across the records
+        self.assertEqual("café\nnext", output_transcoder.get_between(0, output_transcoder.content_size))
+        self.assertRaises(ValueError, list, read_recording(__file__))
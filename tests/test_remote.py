@@ -0,0 +1,59 @@
+# Copyright (C) 2016-2017 Perceval Wajsburt <perceval.wajsburt@gmail.com>
+#
+# This module is part of SublimeTerm and is released under
+# the MIT License: http://www.opensource.org/licenses/mit-license.php
+
+from unittest import TestCase
+from sublimeterm.remote import RemoteOutputTranscoder, RemoteProcessController
+
+from sublimeterm.input_transcoder import *
+from sublimeterm.output_transcoder import OutputTranscoder
+
+
+class TestRemoteOutputTranscoder(TestCase):
+    def test_coalesced_damages(self):
+        sm = OutputTranscoder()
+        mirror = RemoteOutputTranscoder()
+
+        def forward():
+            mirror.apply_damage(*(sm.pop_output(timeout=1) + (0,)))
+
+        sm.begin_sequence()
+        sm.write("the cat is angry")
+        sm.crlf()
+        sm.write("the dog")
+        sm.end_sequence()
+        forward()
+        view = mirror.pop_output(timeout=1)[0]
+
+        sm.begin_sequence()
+        sm.move_up(1)
+        sm.cr()
+        sm.erase_end_of_line()
+        sm.write("a bird")
+        sm.end_sequence()
+        forward()
+
+        sm.begin_sequence()
+        sm.move_down(1)
+        sm.write(" is happy")
+        sm.end_sequence()
+        forward()
+
+        self.assertEqual(sm.get_between(0, sm.content_size), mirror.get_between(0, mirror.content_size))
+
+        # The two last damages are returned as a single change
+        (content, begin, cursor, end, delta, size) = mirror.pop_output(timeout=1)
+        view = view[:begin] + content + view[end - delta:]
+        self.assertEqual(sm.get_between(0, sm.content_size), view)
+        self.assertEqual(sm.cursor, cursor)
+
+
+class TestRemoteProcessController(TestCase):
+    def test_no_input(self):
+        input_transcoder = InputTranscoder()
+        output_transcoder = RemoteOutputTranscoder()
+        with RemoteProcessController(input_transcoder, output_transcoder, command=["echo", 'Hello World']) as controller:
+            self.assertTrue(controller.wait_idle(timeout=10))
+            expected_result = ('Hello World\n', 0, 12, 12, 12, 12)
+            self.assertEqual(expected_result, output_transcoder.pop_output(timeout=2))
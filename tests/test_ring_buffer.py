@@ -0,0 +1,45 @@
+# Copyright (C) 2016-2017 Perceval Wajsburt <perceval.wajsburt@gmail.com>
+#
+# This module is part of SublimeTerm and is released under
+# the MIT License: http://www.opensource.org/licenses/mit-license.php
+
+from unittest import TestCase
+from sublimeterm.ring_buffer import RingBuffer
+import os
+
+
+class TestRingBuffer(TestCase):
+    def test_wrap_around(self):
+        ring = RingBuffer(8)
+
+        self.assertEqual(6, ring.write(b"abcdef"))
+        ring.consume(4)
+        self.assertEqual(6, ring.write(b"ghijklmn"))
+        self.assertEqual(0, ring.free())
+
+        # The filled part crosses the end of the buffer
+        spans = ring.spans()
+        self.assertEqual(2, len(spans))
+        self.assertEqual(b"efghijkl", b"".join(bytes(span) for span in spans))
+        self.assertEqual(b"efg", b"".join(bytes(span) for span in ring.spans(3)))
+
+        ring.consume(3)
+        self.assertEqual(5, len(ring))
+        self.assertEqual(b"hijkl", b"".join(bytes(span) for span in ring.spans()))
+
+    def test_read_from(self):
+        ring = RingBuffer(8)
+        ring.write(b"abcdef")
+        ring.consume(6)
+
+        read_fd, write_fd = os.pipe()
+        os.write(write_fd, b"0123456789")
+        self.assertEqual(8, ring.read_from(read_fd))
+        self.assertEqual(b"01234567", b"".join(bytes(span) for span in ring.spans()))
+        self.assertRaises(BufferError, ring.read_from, read_fd)
+
+        ring.consume(8)
+        self.assertEqual(2, ring.read_from(read_fd))
+        self.assertTrue(ring.wait_data(timeout=0))
+        os.close(read_fd)
+        os.close(write_fd)
@@ -0,0 +1,52 @@
+# Copyright (C) 2016-2017 Perceval Wajsburt <perceval.wajsburt@gmail.com>
+#
+# This module is part of SublimeTerm and is released under
+# the MIT License: http://www.opensource.org/licenses/mit-license.php
+
+from unittest import TestCase
+from benchmarks.workload import Workload, command, generate
+from sublimeterm import ansi_output_transcoder
+from sublimeterm.ansi_output_transcoder import ANSIOutputTranscoder
+from sublimeterm.input_transcoder import InputTranscoder
+from sublimeterm.process_controller import ProcessController
+
+
+class TestWorkload(TestCase):
+    def test_registered_sequences(self):
+        output_transcoder = ANSIOutputTranscoder()
+        unknown = []
+
+        def log(fsm):
+            unknown.append((fsm.input_symbol, fsm.current_state))
+        # Catch every symbol the parser does not expect
+        state = output_transcoder.state
+        state.default_transition = (log, 'INIT')
+        for table in (state.state_transitions, state.state_transitions_any):
+            for (key, (action, next_state)) in list(table.items()):
+                if action is ansi_output_transcoder.DoLog:
+                    table[key] = (log, next_state)
+
+        for cursor in ("none", "relative", "absolute", "mixed"):
+            workload = Workload(seed=1, cursor=cursor, text_ratio=0.5, unicode=0.2)
+            stream = ''.join(workload.chunks(3000))
+            output_transcoder.decode(stream)
+            self.assertEqual([], unknown)
+            self.assertAlmostEqual(0.5, workload.text_size / float(workload.text_size + workload.escape_size),
+                                   delta=0.05)
+
+    def test_seed(self):
+        self.assertEqual(generate(2000, seed=4, sgr=0.8), generate(2000, seed=4, sgr=0.8))
+        self.assertNotEqual(generate(2000, seed=4), generate(2000, seed=5))
+        self.assertNotIn('\x1b', generate(2000, text_ratio=1, sgr=0))
+        self.assertRaises(ValueError, Workload, cursor="diagonal")
+
+    def test_child_command(self):
+        input_transcoder = InputTranscoder()
+        output_transcoder = ANSIOutputTranscoder()
+        expected = ANSIOutputTranscoder()
+        expected.decode(generate(2000, seed=2, cursor="none", progress=0))
+        with ProcessController(input_transcoder, output_transcoder,
+                               command=command(seed=2, size=2000, cursor="none", progress=0)) as controller:
+            controller.wait_for(lambda content: len(content) >= expected.content_size, timeout=5)
+        self.assertEqual(expected.get_between(0, expected.content_size),
+                         output_transcoder.get_between(0, output_transcoder.content_size))